@@ -1,12 +1,46 @@
+import re
+from datetime import datetime
+
 from django.contrib import admin
+
+from core.pagination import EstimatedCountPaginator
 from .models import Profile, Arrangement
+from .search import search_profiles
+
+# Списки админки рассчитаны на годы истории расстановки:
+# без фильтров со списком всех сотрудников, FK через автодополнение,
+# связанные объекты одним JOIN и оценка числа строк вместо COUNT(*) по всей таблице.
+
+SEARCH_DATE_FORMATS = ("%d.%m.%Y", "%Y-%m-%d")
+# ИНН — 14 цифр; ищется точным совпадением по уникальному индексу, а не по документу поиска
+_PIN_RE = re.compile(r"^\d{14}$")
+
+
+def _parse_search_date(term):
+    for fmt in SEARCH_DATE_FORMATS:
+        try:
+            return datetime.strptime(term.strip(), fmt).date()
+        except ValueError:
+            pass
+    return None
 
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ("first_name", "last_name", "position", "office", "birth_date", "gender")
-    search_fields = ("first_name", "last_name", "pin")
-    list_filter = ("gender", "position", "office")
+    list_select_related = ("position", "office")
+    # Полнотекстовый поиск accounts.search (ФИО, телефоны, email); поле нужно, чтобы админка показала поиск
+    search_fields = ("search_text",)
+    search_help_text = "ФИО, телефон, email или ИНН (14 цифр)"
+    list_filter = ("gender", "status", "is_inspector", "office", "position__department")
+    autocomplete_fields = ("user", "position", "office")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        if _PIN_RE.match(search_term.strip()):
+            return queryset.filter(pin=search_term.strip()), False
+        return search_profiles(queryset, search_term), False
 
 
 @admin.register(Arrangement)
@@ -14,5 +48,21 @@ class ArrangementAdmin(admin.ModelAdmin):
     list_display = ("date_create", "profile", "position", "audit_conducting", "audit_purpose",
                     "order_num_date", "order_dates", "audit_address", "on_status", "time_check", "time_not_start",
                     "response_audit")
-    search_fields = ("profile", "date_create")
-    list_filter = ("date_create", "profile")
\ No newline at end of file
+    list_select_related = ("profile", "position", "response_audit")
+    date_hierarchy = "date_create"
+    # Порядок по уникальному (date_create, profile) — страница читается по индексу без сортировки
+    ordering = ("-date_create", "-profile")
+    search_fields = ("profile__search_text",)
+    search_help_text = "ФИО или телефон сотрудника, либо дата (ДД.ММ.ГГГГ)"
+    list_filter = ("profile__is_inspector", "profile__office")
+    autocomplete_fields = ("profile", "position", "response_audit")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        day = _parse_search_date(search_term)
+        if day is not None:
+            return queryset.filter(date_create=day), False
+        return queryset.filter(profile__in=search_profiles(Profile.objects.all(), search_term).values("pk")), False
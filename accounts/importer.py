@@ -0,0 +1,261 @@
+import csv
+import os
+from itertools import islice
+
+import openpyxl
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from core.directory import bump_directory_version
+from core.models import Office, Department, Position
+from .models import Profile
+from .pins import decode_pins, PIN_OK, PIN_ERROR_MESSAGES
+from .search import profile_search_document, rebuild_search_index
+
+# Импорт штата из Excel/CSV.
+# Файл читается потоково (openpyxl read_only / csv), филиалы, отделы и должности ищутся по имени
+# в словарях, загруженных один раз, а сотрудники сохраняются пачками с ключом по ПИН.
+
+# Простые поля профиля, которые можно взять из файла
+PROFILE_FIELDS = (
+    "last_name", "first_name", "patronymic", "email",
+    "phone_number_work", "phone_number_mobile", "phone_number_government", "office_number",
+    "status", "is_inspector",
+)
+
+# Дополнительные варианты заголовков колонок (к имени поля и его verbose_name)
+HEADER_ALIASES = {
+    "pin": ["пин", "инн", "pin"],
+    "office": ["филиал", "офис"],
+    "department": ["отдел", "бөлүм"],
+    "position": ["должность", "кызмат орду"],
+    "last_name": ["фамилиясы"],
+    "first_name": ["аты"],
+    "patronymic": ["атасынын аты"],
+    "phone_number_government": ["правительственный телефон", "өкмөттүк №"],
+    "office_number": ["кабинет", "каб. №"],
+}
+
+TRUE_VALUES = {"1", "да", "ооба", "true", "yes", "+"}
+
+
+def _norm(value):
+    return " ".join(str(value).split()).casefold() if value is not None else ""
+
+
+def _header_map():
+    mapping = {}
+    for field in PROFILE_FIELDS + ("pin",):
+        model_field = Profile._meta.get_field(field)
+        mapping[_norm(field)] = field
+        mapping[_norm(model_field.verbose_name)] = field
+    for field, aliases in HEADER_ALIASES.items():
+        for alias in aliases:
+            mapping[_norm(alias)] = field
+    return mapping
+
+
+def read_rows(path):
+    """Построчно отдаёт словари {поле: значение} из .xlsx или .csv"""
+    header_map = _header_map()
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension in (".xlsx", ".xlsm"):
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            yield from _rows_to_dicts(rows, header_map)
+        finally:
+            wb.close()
+    elif extension == ".csv":
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+                yield from _rows_to_dicts(csv.reader(f, dialect), header_map)
+            except csv.Error as e:
+                raise ValueError(f"Не удалось разобрать CSV: {e}") from e
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла: {extension or path}")
+
+
+def _rows_to_dicts(rows, header_map):
+    header = next(rows, None)
+    if header is None:
+        return
+    fields = [header_map.get(_norm(title)) for title in header]
+    if "pin" not in fields:
+        raise ValueError("В файле нет колонки с ПИН.")
+    for line, values in enumerate(rows, start=2):
+        row = {field: value for field, value in zip(fields, values) if field}
+        if any(value not in (None, "") for value in row.values()):
+            yield line, row
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors = []  # (строка файла, ПИН, сообщение)
+        self.changes = []  # (ПИН, {поле: (было, стало)}) — для отчёта dry-run
+
+    @property
+    def total(self):
+        return self.created + self.updated + self.unchanged + len(self.errors)
+
+
+class EmployeeImporter:
+    def __init__(self, create_missing=False, batch_size=1000, dry_run=False):
+        self.create_missing = create_missing
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.report = ImportReport()
+
+    def run(self, rows):
+        with transaction.atomic():
+            self.load_lookups()
+            rows = iter(rows)
+            while batch := list(islice(rows, self.batch_size)):
+                self.import_batch(batch)
+
+            if self.dry_run:
+                transaction.set_rollback(True)
+            else:
+                # bulk_create/bulk_update не вызывают сигналы
+                rebuild_search_index()
+                transaction.on_commit(bump_directory_version)
+        return self.report
+
+    def load_lookups(self):
+        self.statuses = {}
+        for key, label in Profile.STATUS_CHOICES:
+            self.statuses[_norm(key)] = key
+            self.statuses[_norm(label)] = key
+        self.statuses[""] = "active"
+        self.offices = {_norm(o.name): o for o in Office.objects.all()}
+        self.departments = {_norm(d.name): d for d in Department.objects.all()}
+        self.positions = {
+            (_norm(p.title), _norm(p.department.name) if p.department else ""): p
+            for p in Position.objects.select_related("department")
+        }
+
+    def resolve_office(self, name):
+        if not _norm(name):
+            return None
+        office = self.offices.get(_norm(name))
+        if office is None:
+            if not self.create_missing:
+                raise LookupError(f"Филиал «{name}» не найден.")
+            office = Office.objects.create(name=str(name).strip(), city="-", address="-")
+            self.offices[_norm(name)] = office
+        return office
+
+    def resolve_position(self, title, department_name):
+        if not _norm(title):
+            return None
+        department = None
+        if _norm(department_name):
+            department = self.departments.get(_norm(department_name))
+            if department is None:
+                if not self.create_missing:
+                    raise LookupError(f"Отдел «{department_name}» не найден.")
+                department = Department.objects.create(name=str(department_name).strip())
+                self.departments[_norm(department_name)] = department
+
+        key = (_norm(title), _norm(department.name) if department else "")
+        position = self.positions.get(key)
+        if position is None:
+            if not self.create_missing:
+                raise LookupError(f"Должность «{title}» не найдена.")
+            position = Position.objects.create(title=str(title).strip(), department=department)
+            self.positions[key] = position
+        return position
+
+    def import_batch(self, batch):
+        pins = [str(row.get("pin") or "").strip() for _, row in batch]
+        birth_dates, genders, pin_errors = decode_pins(pins)
+        existing = Profile.objects.in_bulk([pin for pin in pins if pin], field_name="pin")
+
+        to_create = {}
+        to_update = {}
+        update_fields = set()
+        for (line, row), pin, birth_date, gender, pin_error in zip(batch, pins, birth_dates, genders, pin_errors):
+            if pin_error != PIN_OK:
+                self.report.errors.append((line, pin, PIN_ERROR_MESSAGES[pin_error]))
+                continue
+            try:
+                values = self.row_values(row)
+            except (LookupError, ValidationError) as e:
+                self.report.errors.append((line, pin, "; ".join(e.messages) if isinstance(e, ValidationError)
+                                           else str(e)))
+                continue
+
+            profile = existing.get(pin) or to_create.get(pin)
+            if profile is None:
+                profile = Profile(pin=pin, birth_date=birth_date, gender=gender, **values)
+                profile.search_text = profile_search_document(profile)
+                to_create[pin] = profile
+                continue
+
+            diff = {
+                field: (getattr(profile, field), value)
+                for field, value in values.items()
+                if getattr(profile, field) != value
+            }
+            if not diff:
+                if pin not in to_update and pin not in to_create:
+                    self.report.unchanged += 1
+                continue
+            for field, (_, value) in diff.items():
+                setattr(profile, field, value)
+            self.report.changes.append((pin, diff))
+            if pin not in to_create:
+                to_update[pin] = profile
+                update_fields.update(diff)
+
+        # auto_now не срабатывает в bulk_update — updated_at нужен админке и ETag справочника
+        now = timezone.now()
+        for profile in [*to_create.values(), *to_update.values()]:
+            profile.updated_at = now
+        Profile.objects.bulk_create(list(to_create.values()), batch_size=500)
+        if to_update:
+            Profile.objects.bulk_update(list(to_update.values()), sorted(update_fields | {"updated_at"}),
+                                        batch_size=500)
+        self.report.created += len(to_create)
+        self.report.updated += len(to_update)
+
+    def row_values(self, row):
+        values = {}
+        for field in PROFILE_FIELDS:
+            if field not in row:
+                continue
+            value = row[field]
+            if field == "is_inspector":
+                value = _norm(value) in TRUE_VALUES
+            elif field == "status":
+                value = self.statuses.get(_norm(value))
+                if value is None:
+                    raise LookupError(f"Неизвестный статус «{row[field]}».")
+            else:
+                model_field = Profile._meta.get_field(field)
+                value = "" if value is None else str(value).strip()
+                if not value and model_field.null:
+                    value = None
+                # Длина и формат (email) — как в full_clean; иначе серверная СУБД уронит весь импорт
+                try:
+                    model_field.run_validators(value)
+                except ValidationError as e:
+                    raise ValidationError([f"{model_field.verbose_name}: {message}" for message in e.messages])
+            values[field] = value
+
+        # Связи сравниваем и сохраняем по *_id — без запроса на каждую строку
+        if "office" in row:
+            office = self.resolve_office(row["office"])
+            values["office_id"] = office.id if office else None
+        if "position" in row:
+            position = self.resolve_position(row["position"], row.get("department"))
+            values["position_id"] = position.id if position else None
+        return values
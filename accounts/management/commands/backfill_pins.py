@@ -0,0 +1,66 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Profile
+from core.directory import bump_directory_version
+from accounts.pins import decode_pins, PIN_OK, PIN_ERROR_MESSAGES
+
+
+class Command(BaseCommand):
+    help = "Заполняет дату рождения и пол сотрудников по ПИН пакетно (bulk_update)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--overwrite", action="store_true",
+                            help="Пересчитать и уже заполненные значения, а не только пустые")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--dry-run", action="store_true", help="Только отчёт, без записи в БД")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        queryset = Profile.objects.exclude(pin__isnull=True).exclude(pin="").order_by("id")
+        rows = queryset.values_list("id", "pin", "birth_date", "gender")
+
+        updated = 0
+        error_counts = Counter()
+        error_examples = []
+        last_id = 0
+        while True:
+            # Постранично по id, чтобы не держать в памяти весь штат
+            chunk = list(rows.filter(id__gt=last_id)[:batch_size])
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+
+            birth_dates, genders, errors = decode_pins([pin for _, pin, _, _ in chunk])
+            changed = []
+            for (pk, pin, old_birth_date, old_gender), birth_date, gender, error in zip(
+                    chunk, birth_dates, genders, errors):
+                if error != PIN_OK:
+                    error_counts[error] += 1
+                    if len(error_examples) < 20:
+                        error_examples.append((pk, pin, error))
+                    continue
+                new_birth_date = birth_date if options["overwrite"] or not old_birth_date else old_birth_date
+                new_gender = gender if options["overwrite"] or not old_gender else old_gender
+                if (new_birth_date, new_gender) != (old_birth_date, old_gender):
+                    changed.append(Profile(id=pk, birth_date=new_birth_date, gender=new_gender,
+                                           updated_at=timezone.now()))
+
+            if changed and not options["dry_run"]:
+                with transaction.atomic():
+                    # bulk_update не вызывает сигналы и не трогает auto_now — updated_at нужен для ETag страниц
+                    Profile.objects.bulk_update(changed, ["birth_date", "gender", "updated_at"], batch_size=500)
+            updated += len(changed)
+
+        if updated and not options["dry_run"]:
+            transaction.on_commit(bump_directory_version)
+
+        verb = "Будет обновлено" if options["dry_run"] else "Обновлено"
+        self.stdout.write(self.style.SUCCESS(f"{verb} профилей: {updated}"))
+        for code, count in error_counts.most_common():
+            self.stdout.write(self.style.WARNING(f"{PIN_ERROR_MESSAGES[code]} — {count}"))
+        for pk, pin, code in error_examples:
+            self.stdout.write(f"  id={pk} ПИН={pin}: {code}")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import Profile
+from accounts.photos import update_photo_variants
+
+
+class Command(BaseCommand):
+    help = "Строит уменьшенные копии (JPEG и WebP) для уже загруженных фото профилей"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Перестроить и те, у кого копии уже есть")
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        profiles = (Profile.objects.exclude(user_photo="").exclude(user_photo__isnull=True)
+                    .only("id", "user_photo", "photo_variants", "updated_at").order_by("id"))
+        processed = 0
+        updated = 0
+        changed = []
+        for profile in profiles.iterator(chunk_size=options["batch_size"]):
+            processed += 1
+            if update_photo_variants(profile, force=options["force"]):
+                # updated_at сдвигаем, чтобы страницы с ETag показали новые копии
+                profile.updated_at = timezone.now()
+                changed.append(profile)
+            if len(changed) >= options["batch_size"]:
+                Profile.objects.bulk_update(changed, ["photo_variants", "updated_at"])
+                updated += len(changed)
+                changed = []
+        if changed:
+            Profile.objects.bulk_update(changed, ["photo_variants", "updated_at"])
+            updated += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(f"Фото просмотрено: {processed}, обновлено копий: {updated}"))
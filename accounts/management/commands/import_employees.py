@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.importer import EmployeeImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = ("Импорт сотрудников из .xlsx/.csv: создаёт новых и обновляет существующих по ПИН. "
+            "Заголовки колонок — названия полей профиля (Фамилия, Имя, ИНН, Филиал, Отдел, Должность, ...)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--dry-run", action="store_true", help="Показать изменения, ничего не сохраняя")
+        parser.add_argument("--create-missing", action="store_true",
+                            help="Создавать отсутствующие филиалы, отделы и должности")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        importer = EmployeeImporter(create_missing=options["create_missing"],
+                                    batch_size=options["batch_size"], dry_run=options["dry_run"])
+        try:
+            report = importer.run(read_rows(options["path"]))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if options["dry_run"]:
+            for pin, diff in report.changes:
+                changes = "; ".join(f"{field}: {old!r} → {new!r}" for field, (old, new) in diff.items())
+                self.stdout.write(f"~ {pin}: {changes}")
+        for line, pin, message in report.errors:
+            self.stdout.write(self.style.WARNING(f"строка {line} (ПИН {pin or '—'}): {message}"))
+
+        prefix = "[dry-run] " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Строк: {report.total}, создано: {report.created}, обновлено: {report.updated}, "
+            f"без изменений: {report.unchanged}, ошибок: {len(report.errors)}"
+        ))
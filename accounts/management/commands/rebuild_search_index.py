@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from accounts.search import create_search_table, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Перестраивает поисковый индекс сотрудников (FTS5 на SQLite и поле search_text)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        if create_search_table(using=options["database"]):
+            self.stdout.write("FTS5: таблица поиска готова")
+        count = rebuild_search_index(using=options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано профилей: {count}"))
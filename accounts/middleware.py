@@ -0,0 +1,51 @@
+from functools import partial
+
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .models import Profile
+
+# Связь User → Profile: загруженный профиль кладём в кэш связи у пользователя,
+# и user.profile после этого тоже не ходит в БД
+PROFILE_RELATION = Profile._meta.get_field("user").remote_field
+
+
+def current_profile_queryset():
+    return Profile.objects.select_related("position", "position__department", "office")
+
+
+def _cache_profile(user, profile):
+    PROFILE_RELATION.set_cached_value(user, profile)  # None — профиля нет, user.profile бросит DoesNotExist
+    if profile is not None:
+        Profile._meta.get_field("user").set_cached_value(profile, user)
+
+
+def _get_profile(request):
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    if not PROFILE_RELATION.is_cached(user):
+        _cache_profile(user, current_profile_queryset().filter(user=user).first())
+    return PROFILE_RELATION.get_cached_value(user)
+
+
+async def _aget_profile(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None
+    if not PROFILE_RELATION.is_cached(user):
+        _cache_profile(user, await current_profile_queryset().filter(user=user).afirst())
+    return PROFILE_RELATION.get_cached_value(user)
+
+
+class CurrentProfileMiddleware(MiddlewareMixin):
+    """request.profile — профиль текущего пользователя с должностью, отделом и филиалом, одним запросом.
+
+    Ставится после AuthenticationMiddleware. Загрузка ленивая: профиль читается при первом обращении
+    к request.profile, поэтому JSON и опрос за него не платят, а request.user остаётся обычным.
+    None — анонимный пользователь или пользователь без профиля. В асинхронном коде — await request.aprofile().
+    """
+
+    def process_request(self, request):
+        request.profile = SimpleLazyObject(partial(_get_profile, request))
+        request.aprofile = partial(_aget_profile, request)
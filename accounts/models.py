@@ -6,6 +6,8 @@ from core.models import Office, Position
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from .search import profile_search_document
+
 
 class Profile(models.Model):
     GENDER_CHOICES = [
@@ -50,6 +52,11 @@ class Profile(models.Model):
             else:
                 raise ValidationError("Invalid first digit in PIN for gender determination.")
 
+        self.search_text = profile_search_document(self)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "search_text" not in update_fields:
+            kwargs["update_fields"] = [*update_fields, "search_text"]
+
         super().save(*args, **kwargs)
 
     def full_name(self):
@@ -77,6 +84,8 @@ class Profile(models.Model):
 
     # Дополнительно
     user_photo = models.ImageField("Фото пользователя", upload_to="user_photos/", blank=True, null=True)
+    # Уменьшенные копии фото в JPEG и WebP (см. accounts.photos)
+    photo_variants = models.JSONField("Копии фото", default=dict, blank=True, editable=False)
     bio = models.TextField("О себе", blank=True, null=True, default="-")
 
     # Служебные поля
@@ -84,9 +93,17 @@ class Profile(models.Model):
     updated_at = models.DateTimeField("Обновлён", auto_now=True)
     status = models.CharField("Статус", max_length=10, choices=STATUS_CHOICES, default="active")
     is_inspector = models.BooleanField("Инспектор", default=False)
+    # Нормализованный текст для поиска (см. accounts.search)
+    search_text = models.TextField("Поисковый текст", blank=True, default="", editable=False)
 
 
 class Arrangement(models.Model):
+    # Текстовые ячейки таблицы расстановки, которые редактируются с сетки
+    EDITABLE_FIELDS = (
+        "audit_conducting", "audit_purpose", "order_num_date", "order_dates",
+        "audit_address", "on_status", "time_check", "time_not_start",
+    )
+
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="arrangements")
     position = models.ForeignKey(Position, on_delete=models.SET_NULL, null=True, blank=True)
     audit_conducting = models.CharField(
@@ -118,6 +135,31 @@ class Arrangement(models.Model):
         verbose_name = "Расстановка"
         verbose_name_plural = "Расстановки"
         ordering = ["-date_create", "profile__last_name"]
+        constraints = [
+            # Один сотрудник — одна строка на день; индекс (date_create, profile) обслуживает
+            # и выборку дня, и диапазоны дат, и upsert при импорте
+            models.UniqueConstraint(fields=["date_create", "profile"], name="unique_arrangement_day_profile"),
+        ]
 
     def __str__(self):
         return f"{self.profile.full_name()} — {self.date_create}"
+
+
+class ArrangementDaySummary(models.Model):
+    """Сводка расстановки центрального аппарата за день (см. core.arrangements.refresh_day_summaries)"""
+    date = models.DateField("Дата", unique=True)
+    total = models.PositiveIntegerField("Всего записей", default=0)
+    inspectors = models.PositiveIntegerField("Инспекторов", default=0)
+    on_audit = models.PositiveIntegerField("На аудите / ВАК / обучении", default=0)
+    on_leave = models.PositiveIntegerField("В отпуске / на больничном", default=0)
+    absent_at_check = models.PositiveIntegerField("Отмечены при проверке в 9:15", default=0)
+    not_started = models.PositiveIntegerField("Аудит/отпуск ещё не начался", default=0)
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Сводка расстановки"
+        verbose_name_plural = "Сводки расстановки"
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.date}: {self.total}"
@@ -0,0 +1,82 @@
+import hashlib
+import io
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Уменьшенные копии фото профиля.
+# Для каждого размера пишем JPEG и WebP; имя файла содержит хэш исходника, поэтому
+# файл никогда не меняется по тому же адресу и его можно кэшировать навсегда.
+
+PHOTO_SIZES = {
+    "small": 64,  # аватар в шапке
+    "medium": 320,  # карточка сотрудника
+}
+PHOTO_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 6}),
+    "jpeg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+THUMBS_DIR = "user_photos/thumbs"
+
+logger = logging.getLogger(__name__)
+
+
+def photo_hash(photo):
+    digest = hashlib.sha256()
+    photo.open("rb")
+    try:
+        for chunk in photo.chunks():
+            digest.update(chunk)
+    finally:
+        photo.close()
+    return digest.hexdigest()[:16]
+
+
+def build_photo_variants(photo):
+    """{"source": имя исходника, "small": {"webp": путь, "jpeg": путь}, ...}"""
+    source_hash = photo_hash(photo)
+    variants = {"source": photo.name}
+    image = None
+    try:
+        for size_name, size in PHOTO_SIZES.items():
+            variants[size_name] = {}
+            for fmt, (pil_format, options) in PHOTO_FORMATS.items():
+                path = posixpath.join(THUMBS_DIR, f"{source_hash}-{size}.{fmt}")
+                if not default_storage.exists(path):
+                    if image is None:
+                        photo.open("rb")
+                        # exif_transpose: фото с телефона иначе окажутся повёрнутыми
+                        image = ImageOps.exif_transpose(Image.open(photo)).convert("RGB")
+                    thumb = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+                    buffer = io.BytesIO()
+                    thumb.save(buffer, pil_format, **options)
+                    path = default_storage.save(path, ContentFile(buffer.getvalue()))
+                variants[size_name][fmt] = path
+    finally:
+        if image is not None:
+            photo.close()
+    return variants
+
+
+def update_photo_variants(profile, force=False):
+    """Строит копии для текущего фото профиля; возвращает True, если photo_variants изменились"""
+    old = profile.photo_variants or {}
+    if not profile.user_photo:
+        new = {}
+    elif not force and old.get("source") == profile.user_photo.name and all(size in old for size in PHOTO_SIZES):
+        return False
+    else:
+        try:
+            new = build_photo_variants(profile.user_photo)
+        except OSError:
+            # Битый или отсутствующий файл — страница покажет исходник как раньше
+            logger.warning("Не удалось построить копии фото профиля %s", profile.pk, exc_info=True)
+            return False
+    if new == old:
+        return False
+    # Старые копии не удаляем: у другого профиля может быть то же фото (имя по хэшу общее)
+    profile.photo_variants = new
+    return True
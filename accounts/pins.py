@@ -0,0 +1,69 @@
+from datetime import date
+
+# Пакетная расшифровка ПИН (ИНН): 1-я цифра — пол, 2–9 — дата рождения ДДММГГГГ, всего 14 цифр.
+# Вместо strptime на каждую строку: проверка длины и цифр одним проходом, дата собирается из срезов,
+# а одинаковые даты рождения (их в штате много) разбираются один раз.
+PIN_LENGTH = 14
+
+PIN_OK = ""
+PIN_EMPTY = "empty"
+PIN_LENGTH_ERROR = "length"
+PIN_NOT_DIGITS = "not_digits"
+PIN_GENDER_ERROR = "gender"
+PIN_BIRTH_DATE_ERROR = "birth_date"
+
+PIN_ERROR_MESSAGES = {
+    PIN_EMPTY: "ПИН не указан.",
+    PIN_LENGTH_ERROR: "PIN must be exactly 14 characters long.",
+    PIN_NOT_DIGITS: "ПИН должен состоять только из цифр.",
+    PIN_GENDER_ERROR: "Invalid first digit in PIN for gender determination.",
+    PIN_BIRTH_DATE_ERROR: "Invalid PIN format for birth date extraction.",
+}
+
+GENDERS_BY_DIGIT = {"1": "female", "2": "male"}
+
+
+def decode_pins(pins):
+    """Расшифровывает список ПИН.
+
+    Возвращает три списка той же длины: даты рождения, пол ("male"/"female") и коды ошибок
+    (PIN_OK для корректных строк). Исключения не бросаются — ошибки собираются построчно.
+    """
+    count = len(pins)
+    birth_dates = [None] * count
+    genders = [""] * count
+    errors = [PIN_OK] * count
+    parsed_dates = {}
+
+    for i, pin in enumerate(pins):
+        pin = (pin or "").strip()
+        if not pin:
+            errors[i] = PIN_EMPTY
+            continue
+        if len(pin) != PIN_LENGTH:
+            errors[i] = PIN_LENGTH_ERROR
+            continue
+        if not (pin.isascii() and pin.isdigit()):
+            errors[i] = PIN_NOT_DIGITS
+            continue
+
+        gender = GENDERS_BY_DIGIT.get(pin[0])
+        if gender is None:
+            errors[i] = PIN_GENDER_ERROR
+            continue
+
+        key = pin[1:9]
+        if key not in parsed_dates:
+            try:
+                parsed_dates[key] = date(int(key[4:8]), int(key[2:4]), int(key[0:2]))
+            except ValueError:
+                parsed_dates[key] = None
+        birth_date = parsed_dates[key]
+        if birth_date is None:
+            errors[i] = PIN_BIRTH_DATE_ERROR
+            continue
+
+        birth_dates[i] = birth_date
+        genders[i] = gender
+
+    return birth_dates, genders, errors
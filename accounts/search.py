@@ -0,0 +1,138 @@
+import re
+
+from django.db import connections, OperationalError
+from django.db.models.expressions import RawSQL
+
+# Поиск сотрудников.
+# На SQLite используется виртуальная таблица FTS5 (триграммы — поиск по подстроке, как icontains),
+# на остальных СУБД — нормализованное поле Profile.search_text.
+# Текст приводится к нижнему регистру в Python: LOWER()/LIKE в SQLite не понимают кириллицу,
+# а str.casefold() корректно обрабатывает и кыргызские буквы (Ң/ң, Ө/ө, Ү/ү).
+SEARCH_TABLE = "accounts_profile_search"
+
+# Триграммный индекс не ищет подстроки короче трёх символов
+MIN_FTS_TOKEN = 3
+
+_PHONE_QUERY_RE = re.compile(r"^[\d\s()+\-]+$")
+_NON_DIGIT_RE = re.compile(r"\D")
+
+
+def normalize_search_text(value):
+    return " ".join((value or "").casefold().replace("ё", "е").split())
+
+
+def profile_search_document(profile):
+    """Текст, по которому ищется сотрудник: ФИО, телефоны (в т.ч. только цифрами) и email"""
+    phones = [profile.phone_number_work, profile.phone_number_government, profile.phone_number_mobile]
+    parts = [profile.last_name, profile.first_name, profile.patronymic, profile.email]
+    for phone in phones:
+        if phone and phone != "-":
+            parts.append(phone)
+            parts.append(_NON_DIGIT_RE.sub("", phone))
+    return normalize_search_text(" ".join(part for part in parts if part))
+
+
+def _query_tokens(query):
+    query = normalize_search_text(query)
+    if _PHONE_QUERY_RE.match(query):
+        # "62 54 62" и "625462" — один и тот же номер
+        digits = _NON_DIGIT_RE.sub("", query)
+        return [digits] if digits else []
+    return query.split()
+
+
+def _table_exists(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+        return cursor.fetchone() is not None
+
+
+def _fts_available(conn):
+    if conn.vendor != "sqlite":
+        return False
+    # Проверяем один раз на каждую базу (у тестовой БД своё имя)
+    name = conn.settings_dict["NAME"]
+    cache = conn.__dict__.setdefault("_profile_fts_available", {})
+    if name not in cache:
+        cache[name] = _table_exists(conn)
+    return cache[name]
+
+
+def search_profiles(queryset, query):
+    """Фильтрует queryset профилей: каждое слово запроса должно встречаться у сотрудника"""
+    tokens = _query_tokens(query)
+    if not tokens:
+        return queryset
+
+    long_tokens = [t for t in tokens if len(t) >= MIN_FTS_TOKEN]
+    short_tokens = [t for t in tokens if len(t) < MIN_FTS_TOKEN]
+
+    if long_tokens and _fts_available(connections[queryset.db]):
+        match = " AND ".join('"{}"'.format(t.replace('"', '""')) for t in long_tokens)
+        queryset = queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [match]
+        ))
+    else:
+        short_tokens = tokens
+
+    for token in short_tokens:
+        queryset = queryset.filter(search_text__contains=token)
+    return queryset
+
+
+def create_search_table(using=None):
+    """Создаёт FTS5-таблицу на SQLite и заполняет её. Возвращает False, если FTS5 недоступен"""
+    conn = connections[using or "default"]
+    if conn.vendor != "sqlite":
+        return False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(body, tokenize='trigram')"
+            )
+    except OperationalError:
+        # SQLite собран без FTS5 или старше 3.34 — остаёмся на search_text
+        return False
+    conn.__dict__.pop("_profile_fts_available", None)
+    rebuild_search_index(using=conn.alias)
+    return True
+
+
+def rebuild_search_index(using=None):
+    """Полная переиндексация (после bulk_create/bulk_update и импорта)"""
+    from .models import Profile
+
+    conn = connections[using or "default"]
+    documents = []
+    changed = []
+    for profile in Profile.objects.using(conn.alias).iterator(chunk_size=2000):
+        document = profile_search_document(profile)
+        documents.append((profile.pk, document))
+        if profile.search_text != document:
+            profile.search_text = document
+            changed.append(profile)
+    Profile.objects.using(conn.alias).bulk_update(changed, ["search_text"], batch_size=500)
+
+    if conn.vendor == "sqlite" and _table_exists(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+            cursor.executemany(f"INSERT INTO {SEARCH_TABLE}(rowid, body) VALUES (%s, %s)", documents)
+    return len(documents)
+
+
+def index_profile(profile, using=None):
+    conn = connections[using or "default"]
+    if not _fts_available(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [profile.pk])
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}(rowid, body) VALUES (%s, %s)",
+                       [profile.pk, profile.search_text])
+
+
+def unindex_profile(pk, using=None):
+    conn = connections[using or "default"]
+    if not _fts_available(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [pk])
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Profile
+from .photos import update_photo_variants
+from .search import index_profile, unindex_profile, create_search_table
+
+
+@receiver(post_save, sender=Profile)
+def update_profile_search(sender, instance, using, **kwargs):
+    index_profile(instance, using=using)
+
+
+@receiver(post_save, sender=Profile)
+def update_profile_photo(sender, instance, using, raw=False, **kwargs):
+    """После загрузки нового фото строим уменьшенные копии"""
+    if raw or not update_photo_variants(instance):
+        return
+    # update() вместо save(): без повторного сигнала; updated_at сдвигаем ради ETag страниц
+    instance.updated_at = timezone.now()
+    Profile.objects.using(using).filter(pk=instance.pk).update(
+        photo_variants=instance.photo_variants, updated_at=instance.updated_at)
+
+
+@receiver(post_delete, sender=Profile)
+def delete_profile_search(sender, instance, using, **kwargs):
+    unindex_profile(instance.pk, using=using)
+
+
+def create_profile_search(sender, using, **kwargs):
+    """Поисковая FTS-таблица не описывается моделью — создаём её после migrate"""
+    create_search_table(using=using)
@@ -0,0 +1,30 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from accounts.photos import PHOTO_SIZES
+
+register = template.Library()
+
+
+@register.simple_tag
+def profile_photo(profile, size="medium", css_class="", alt="", width=None):
+    """<picture> с WebP и JPEG нужного размера; без готовых копий — исходное фото.
+
+    width — размер на странице в CSS-пикселях (копия больше для экранов высокой плотности).
+    """
+    variants = (profile.photo_variants or {}).get(size) if profile else None
+    if not variants:
+        if not profile or not profile.user_photo:
+            return ""
+        if width:
+            return format_html('<img src="{}" alt="{}" class="{}" width="{}" height="{}">',
+                               profile.user_photo.url, alt, css_class, width, width)
+        return format_html('<img src="{}" alt="{}" class="{}">', profile.user_photo.url, alt, css_class)
+
+    pixels = width or PHOTO_SIZES[size]
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp">'
+        '<img src="{}" alt="{}" class="{}" width="{}" height="{}" loading="lazy" decoding="async"></picture>',
+        default_storage.url(variants["webp"]), default_storage.url(variants["jpeg"]), alt, css_class, pixels, pixels,
+    )
@@ -1,3 +1,329 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.template import Context, Template
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from core.directory import get_directory_version
+from core.models import Office, Department, Position, Job
+from core.pagination import EstimatedCountPaginator
+
+from .models import Profile, Arrangement
+from .photos import THUMBS_DIR
+from .pins import (decode_pins, PIN_OK, PIN_EMPTY, PIN_LENGTH_ERROR, PIN_NOT_DIGITS,
+                   PIN_GENDER_ERROR, PIN_BIRTH_DATE_ERROR)
+from .search import search_profiles, SEARCH_TABLE
+from .views import serve_photo_thumbnail
+
+
+class DecodePinsTests(TestCase):
+    def test_decodes_batch_with_per_row_errors(self):
+        birth_dates, genders, errors = decode_pins([
+            "21503199000123",
+            "10102198512345",
+            None,
+            "2150319900012",
+            "2150319900012x",
+            "31503199000123",
+            "23102199000123",
+            "10102198554321",
+        ])
+
+        self.assertEqual(errors, [PIN_OK, PIN_OK, PIN_EMPTY, PIN_LENGTH_ERROR, PIN_NOT_DIGITS,
+                                  PIN_GENDER_ERROR, PIN_BIRTH_DATE_ERROR, PIN_OK])
+        self.assertEqual(birth_dates[0], date(1990, 3, 15))
+        self.assertEqual(birth_dates[1], date(1985, 2, 1))
+        self.assertEqual(birth_dates[7], date(1985, 2, 1))
+        self.assertEqual(genders[:2], ["male", "female"])
+        self.assertIsNone(birth_dates[6])
+
+
+class BackfillPinsCommandTests(TestCase):
+    def test_backfills_missing_birth_date_and_gender(self):
+        good = Profile.objects.create(last_name="Асанов", first_name="Асан", pin="21503199000123")
+        broken = Profile.objects.create(last_name="Бакиров", first_name="Бакыт")
+        Profile.objects.filter(pk=good.pk).update(birth_date=None, gender="")
+        Profile.objects.filter(pk=broken.pk).update(pin="23102199000123")
+        updated_at = Profile.objects.get(pk=good.pk).updated_at
+        version = get_directory_version()
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("backfill_pins", stdout=out)
+
+        good.refresh_from_db()
+        self.assertEqual((good.birth_date, good.gender), (date(1990, 3, 15), "male"))
+        self.assertGreater(good.updated_at, updated_at)
+        self.assertNotEqual(get_directory_version(), version)
+        self.assertIn("Обновлено профилей: 1", out.getvalue())
+        self.assertIn("Invalid PIN format for birth date extraction.", out.getvalue())
+
+
+class ImportEmployeesCommandTests(TestCase):
+    def setUp(self):
+        self.office = Office.objects.create(name="Борбордук аппарат", city="Бишкек", address="-")
+        department = Department.objects.create(name="Аудит бөлүмү")
+        self.position = Position.objects.create(title="Аудитор", department=department)
+        self.existing = Profile.objects.create(last_name="Асанов", first_name="Асан", pin="21503199000123",
+                                               office=self.office, position=self.position)
+
+    def write_csv(self, text):
+        f = tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8", delete=False)
+        f.write(text)
+        f.close()
+        self.addCleanup(os.unlink, f.name)
+        return f.name
+
+    def test_upserts_by_pin(self):
+        path = self.write_csv(
+            "ИНН;Фамилия;Имя;Филиал;Отдел;Должность;Мобильный телефон\n"
+            "21503199000123;Асанов;Асан;Борбордук аппарат;Аудит бөлүмү;Аудитор;0555 000 111\n"
+            "10102198512345;Бакирова;Айгүл;борбордук  аппарат;Аудит бөлүмү;аудитор;\n"
+            "123;Ката;Ката;Борбордук аппарат;;;\n"
+            "20102198512345;Жок;Жок;Ош;;;\n"
+        )
+
+        updated_at = self.existing.updated_at
+        out = StringIO()
+        call_command("import_employees", path, stdout=out)
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.phone_number_mobile, "0555 000 111")
+        self.assertGreater(self.existing.updated_at, updated_at)
+        created = Profile.objects.get(pin="10102198512345")
+        self.assertEqual((created.gender, created.birth_date), ("female", date(1985, 2, 1)))
+        self.assertEqual((created.office_id, created.position_id), (self.office.id, self.position.id))
+        self.assertIn("создано: 1, обновлено: 1", out.getvalue())
+        self.assertIn("ошибок: 2", out.getvalue())
+
+    def test_import_runs_in_batches(self):
+        def import_queries(count, offset):
+            rows = "".join(f"101021985{offset + i:05d};Фамилия{i};Аты;Борбордук аппарат;Аудит бөлүмү;Аудитор\n"
+                           for i in range(count))
+            path = self.write_csv("ИНН;Фамилия;Имя;Филиал;Отдел;Должность\n" + rows)
+            with CaptureQueriesContext(connection) as queries:
+                call_command("import_employees", path, stdout=StringIO())
+            return len(queries)
+
+        # Справочники читаются один раз, сотрудники пишутся пачками — не запрос на строку
+        self.assertLessEqual(import_queries(5, 0), 20)
+        self.assertLessEqual(import_queries(200, 1000), 20)
+        self.assertEqual(Profile.objects.count(), 206)
+
+    def test_invalid_values_are_row_errors(self):
+        path = self.write_csv(
+            "ИНН;Фамилия;Имя;Рабочий телефон;Email\n"
+            "10102198512345;Бакирова;Айгүл;0312 62 54 62 доб. 1234567;\n"
+            "20102198512345;Токтогулов;Бакыт;;не-почта\n"
+            "11503199000123;Асанова;Айгүл;0312 62 54 62;\n"
+        )
+        out = StringIO()
+        call_command("import_employees", path, stdout=out)
+
+        self.assertIn("строка 2 (ПИН 10102198512345): Рабочий телефон:", out.getvalue())
+        self.assertIn("строка 3 (ПИН 20102198512345): Email:", out.getvalue())
+        self.assertIn("создано: 1", out.getvalue())
+        self.assertEqual(set(Profile.objects.values_list("pin", flat=True)), {"21503199000123", "11503199000123"})
+
+    def test_malformed_csv_is_a_command_error(self):
+        path = self.write_csv("ИНН\x00Фамилия\n\x00\x00\n")
+        with self.assertRaisesMessage(CommandError, "Не удалось разобрать CSV"):
+            call_command("import_employees", path, stdout=StringIO())
+
+    def test_dry_run_reports_without_saving(self):
+        path = self.write_csv("ИНН,Фамилия,Имя\n21503199000123,Асанова,Асан\n10102198512345,Бакирова,Айгүл\n")
+
+        out = StringIO()
+        call_command("import_employees", path, "--dry-run", stdout=out)
+
+        self.assertIn("last_name: 'Асанов' → 'Асанова'", out.getvalue())
+        self.assertEqual(Profile.objects.count(), 1)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.last_name, "Асанов")
+
+
+class PhotoThumbnailTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (1200, 900), "steelblue").save(buffer, "JPEG")
+        self.profile = Profile.objects.create(
+            last_name="Асанов", first_name="Асан",
+            user_photo=SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg"),
+        )
+
+    def test_upload_builds_hashed_variants(self):
+        self.profile.refresh_from_db()
+        small = self.profile.photo_variants["small"]
+        self.assertTrue(small["webp"].endswith("-64.webp"))
+        with Image.open(os.path.join(self.media_root, small["jpeg"])) as thumb:
+            self.assertEqual(thumb.size, (64, 64))
+
+        html = Template('{% load profile_photos %}{% profile_photo p "small" "rounded-circle" "avatar" 32 %}').render(
+            Context({"p": self.profile}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('width="32"', html)
+
+        # Маршрут подключается только при DEBUG, а тесты идут без него — вызываем представление напрямую
+        request = RequestFactory().get("/media/" + small["webp"])
+        response = serve_photo_thumbnail(request, os.path.relpath(small["webp"], THUMBS_DIR))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+
+    def test_backfill_command_rebuilds_missing_variants(self):
+        Profile.objects.update(photo_variants={})
+
+        call_command("build_photo_thumbnails", stdout=StringIO())
+
+        self.profile.refresh_from_db()
+        self.assertEqual(set(self.profile.photo_variants), {"source", "small", "medium"})
+
+
+class ArrangementAdminTests(TestCase):
+    url = "/admin/accounts/arrangement/"
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pass"))
+        office = Office.objects.create(name="Борбордук аппарат", city="Бишкек", address="-")
+        self.profiles = [Profile.objects.create(last_name=f"Фамилия{i}", first_name="Аты", office=office)
+                         for i in range(3)]
+        self.add_days(date(2024, 3, 1), 2)
+
+    def add_days(self, start, count):
+        Arrangement.objects.bulk_create([
+            Arrangement(profile=profile, date_create=start + timedelta(days=i), response_audit=profile)
+            for i in range(count) for profile in self.profiles
+        ])
+
+    def changelist_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        before, _ = self.changelist_queries()
+        self.add_days(date(2024, 4, 1), 20)
+        after, _ = self.changelist_queries()
+        self.assertEqual(before, after)
+
+    def test_search_by_name_and_date(self):
+        response = self.changelist_queries(q="фамилия1")[1]
+        self.assertEqual(response.context["cl"].result_count, 2)
+        response = self.changelist_queries(q="02.03.2024")[1]
+        self.assertEqual(response.context["cl"].result_count, 3)
+
+    def test_large_unfiltered_changelist_uses_estimate(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        with patch.object(EstimatedCountPaginator, "estimate_threshold", 1):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url)
+            self.assertEqual(response.context["cl"].result_count, 6)
+            self.assertFalse([q for q in queries if "COUNT(*)" in q["sql"] and "accounts_arrangement" in q["sql"]])
+            # С фильтром — точный подсчёт
+            self.assertEqual(self.client.get(self.url, {"date_create__day": 1, "date_create__month": 3,
+                                                        "date_create__year": 2024}).context["cl"].result_count, 3)
+
+
+class ProfileSearchTests(TestCase):
+    def setUp(self):
+        self.omurbekov = Profile.objects.create(last_name="Өмүрбеков", first_name="Үсөн", patronymic="Ңурланович",
+                                                phone_number_mobile="0555 12-34-56")
+        Profile.objects.create(last_name="Омурбеков", first_name="Усен")
+
+    def search(self, term):
+        return sorted(search_profiles(Profile.objects.all(), term).values_list("last_name", flat=True))
+
+    def fts_rows(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT body FROM {SEARCH_TABLE} WHERE rowid = %s", [self.omurbekov.pk])
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_kyrgyz_letters_fold_case(self):
+        self.assertEqual(self.search("ӨМҮР"), ["Өмүрбеков"])
+        self.assertEqual(self.search("өмүрбеков үсөн"), ["Өмүрбеков"])
+        self.assertEqual(self.search("ңурлан"), ["Өмүрбеков"])
+        self.assertEqual(self.search("ОМУР"), ["Омурбеков"])
+        self.assertEqual(self.search("12 34 56"), ["Өмүрбеков"])
+
+    def test_index_follows_save_and_delete(self):
+        if connection.vendor == "sqlite":
+            self.assertEqual(len(self.fts_rows()), 1)
+
+        self.omurbekov.last_name = "Токтогулов"
+        self.omurbekov.save()
+        self.assertEqual(self.search("өмүр"), [])
+        self.assertEqual(self.search("токтогул"), ["Токтогулов"])
+
+        self.omurbekov.delete()
+        self.assertEqual(self.search("токтогул"), [])
+        if connection.vendor == "sqlite":
+            self.assertEqual(self.fts_rows(), [])
+
+
+class ProfileAdminTests(TestCase):
+    url = "/admin/accounts/profile/"
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pass"))
+        Profile.objects.create(last_name="Асанов", first_name="Бакыт", pin="21203199000123")
+        Profile.objects.create(last_name="Усенова", first_name="Айгуль", pin="11504198500456",
+                               phone_number_mobile="0555 123 456")
+
+    def search(self, term):
+        response = self.client.get(self.url, {"q": term})
+        self.assertEqual(response.status_code, 200)
+        return [profile.last_name for profile in response.context["cl"].result_list]
+
+    def test_search_by_pin_name_and_phone(self):
+        self.assertEqual(self.search("21203199000123"), ["Асанов"])
+        self.assertEqual(self.search(" 11504198500456 "), ["Усенова"])
+        self.assertEqual(self.search("21203199000999"), [])
+        self.assertEqual(self.search("асанов"), ["Асанов"])
+        self.assertEqual(self.search("123456"), ["Усенова"])
+
+
+class CurrentProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        office = Office.objects.create(name="Борбордук аппарат", city="Бишкек", address="-")
+        position = Position.objects.create(title="Аудитор", department=Department.objects.create(name="Аудит"))
+        self.user = User.objects.create_user("asan", password="pass")
+        Profile.objects.create(user=self.user, last_name="Асанов", first_name="Асан", office=office, position=position)
+        self.client.force_login(self.user)
+
+    def test_profile_page_loads_user_and_profile_once(self):
+        self.client.get("/accounts/my-profile/")  # прогрев: версия справочника в кэше
+        # Сессия, пользователь и профиль с должностью, отделом и филиалом
+        with self.assertNumQueries(3):
+            response = self.client.get("/accounts/my-profile/")
+        self.assertContains(response, "Аудитор")
+
+    def test_user_without_profile(self):
+        self.client.force_login(User.objects.create_user("guest", password="pass"))
+        self.assertEqual(self.client.get("/accounts/my-profile/").status_code, 404)
+        self.assertEqual(self.client.get("/contacts/").status_code, 200)
+
+    def test_json_endpoints_do_not_load_profile(self):
+        job = Job.objects.create(kind="contacts_export", created_by=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(f"/jobs/{job.pk}/").status_code, 200)
+        self.assertFalse([q for q in queries if "accounts_profile" in q["sql"]])
@@ -1,10 +1,19 @@
+import os
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404
 from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
 from django.contrib.auth import login
 from django.views.generic import CreateView, DetailView, ListView
+from django.views.static import serve
+
+from core.conditional import ConditionalGetMixin, request_etag
+from core.directory import get_directory_version
 from .forms import SignUpForm
 from .models import Profile, Arrangement
+from .photos import THUMBS_DIR
 
 
 class SignUpView(CreateView):
@@ -19,10 +28,34 @@ class SignUpView(CreateView):
         return response
 
 
-class ProfileDetailView(LoginRequiredMixin, DetailView):
+class ProfileDetailView(LoginRequiredMixin, ConditionalGetMixin, DetailView):
     model = Profile
     template_name = "accounts/dashboard.html"
     context_object_name = "profile"
 
     def get_object(self, queryset=None):
-        return self.request.user.profile
+        # Профиль с должностью и филиалом уже подгружен CurrentProfileMiddleware
+        if not self.request.profile:
+            raise Http404
+        return self.request.profile
+
+    def get_validators(self):
+        profile = self.get_object()
+        return request_etag(self.request, "my-profile", profile.pk, profile.updated_at,
+                            get_directory_version()), profile.updated_at
+
+
+def serve_photo_thumbnail(request, path):
+    """Копия фото профиля. Имя содержит хэш исходника, поэтому содержимое по адресу не меняется.
+
+    Только для разработки, как и остальной /media/ (django.views.static.serve не для боя):
+    маршрут подключается при DEBUG. В бою копии отдаёт nginx с тем же заголовком:
+
+        location /media/user_photos/thumbs/ {
+            alias <MEDIA_ROOT>/user_photos/thumbs/;
+            add_header Cache-Control "public, max-age=31536000, immutable";
+        }
+    """
+    response = serve(request, path, document_root=os.path.join(settings.MEDIA_ROOT, THUMBS_DIR))
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
@@ -5,6 +5,29 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Запуск под ASGI. Справочник, список сотрудников и расстановка — асинхронные представления:
+пока один запрос ждёт кэш или БД, процесс обслуживает других читателей.
+
+    pip install "uvicorn[standard]"
+    python manage.py collectstatic --noinput
+    uvicorn config.asgi:application --host 0.0.0.0 --port 8000 --workers 2
+
+или через gunicorn с воркерами uvicorn (перезапуск упавших процессов):
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker -w 2 -b 0.0.0.0:8000
+
+daphne запускается так же: ``daphne -b 0.0.0.0 -p 8000 config.asgi:application``.
+
+Замечания:
+- статику (/static/, /media/) отдаёт фронтовый сервер (nginx) из STATIC_ROOT и MEDIA_ROOT;
+  без него /static/ раздаёт само приложение при SERVE_STATIC=True;
+- при нескольких воркерах кэш должен быть общим (CACHE_BACKEND=file или redis),
+  иначе версия справочника и кэшированные сессии у процессов разойдутся;
+- под ASGI DB_CONN_MAX_AGE по умолчанию 0 (см. ASGI в настройках): постоянные соединения
+  привязаны к потокам и под ASGI не переиспользуются; для серверной СУБД используйте пул соединений
+  (pgbouncer и т.п.);
+- фоновые задачи по-прежнему выполняет отдельный процесс ``python manage.py run_jobs``.
 """
 
 import os
@@ -12,5 +35,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Настройки, зависящие от интерфейса сервера (CONN_MAX_AGE), читают этот признак
+os.environ.setdefault('ASGI', 'True')
 
 application = get_asgi_application()
@@ -14,6 +14,7 @@ from pathlib import Path
 from decouple import config
 from django.utils.translation import gettext_lazy as _
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,6 +28,9 @@ SECRET_KEY = config("SECRET_KEY")
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config("DEBUG", default=True, cast=bool)
 
+# manage.py test: хранилище статики и уровни логов не зависят от окружения
+TESTING = sys.argv[1:2] == ["test"]
+
 ALLOWED_HOSTS = [
     'localhost', '192.168.20.74', '127.0.0.1'
 ]
@@ -45,12 +49,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestProfilingMiddleware',  # работает только при REQUEST_PROFILING=True
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',  # работает только при SERVE_STATIC=True
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.CurrentProfileMiddleware',  # request.profile — лениво, одним запросом
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -61,8 +68,16 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / "templates"],
-        'APP_DIRS': True,
+        # Кэширующий загрузчик: шаблон читается и компилируется один раз на процесс.
+        # Так Django делает и без этого блока (loaders по умолчанию); список задан явно только чтобы
+        # порядок загрузчиков был виден. При DEBUG кэш сбрасывается автоперезагрузкой при правке шаблонов
         'OPTIONS': {
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -79,12 +94,88 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# По умолчанию SQLite; для серверной СУБД задайте в .env DB_ENGINE, DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+DB_ENGINE = config("DB_ENGINE", default="django.db.backends.sqlite3")
+
+if DB_ENGINE == "django.db.backends.sqlite3":
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': config("DB_NAME", default=str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                # Пишущие транзакции сразу берут блокировку записи — без взаимоблокировок при апгрейде
+                'transaction_mode': 'IMMEDIATE',
+            },
+            'TEST': {
+                # Файловая тестовая БД: WAL и параллельные соединения работают как в бою
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': config("DB_NAME"),
+            'USER': config("DB_USER", default=""),
+            'PASSWORD': config("DB_PASSWORD", default=""),
+            'HOST': config("DB_HOST", default="localhost"),
+            'PORT': config("DB_PORT", default=""),
+        }
+    }
+
+# Запуск через config.asgi (он выставляет ASGI=True до загрузки настроек)
+ASGI = config("ASGI", default=False, cast=bool)
+
+# Переиспользование соединений между запросами (секунды; 0 — новое соединение на каждый запрос).
+# Под ASGI по умолчанию 0: постоянные соединения привязаны к потокам и там не переиспользуются
+DATABASES['default']['CONN_MAX_AGE'] = config("DB_CONN_MAX_AGE", default=0 if ASGI else 60, cast=int)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# PRAGMA, которые выполняются при каждом новом соединении с SQLite (см. core.signals)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # читатели не блокируют писателя и наоборот
+    'synchronous': 'NORMAL',  # в режиме WAL безопасно и заметно быстрее FULL
+    'busy_timeout': 20000,  # ждать освобождения блокировки вместо мгновенного "database is locked"
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32000,  # ~32 МБ страничного кэша
+    'temp_store': 'MEMORY',
+}
+
+# Кэш: версия и снимки справочника, фрагменты шаблонов, сессии.
+# locmem — свой у каждого процесса; при нескольких воркерах задайте общий: file или redis
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',  # нужен пакет redis
+}
+CACHE_BACKEND = config("CACHE_BACKEND", default="locmem")
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': config("CACHE_LOCATION", default={
+            'locmem': 'ais-esep',
+            'file': str(BASE_DIR / 'cache'),
+            'redis': 'redis://127.0.0.1:6379/1',
+        }[CACHE_BACKEND]),
+        'TIMEOUT': 300,
     }
 }
+if CACHE_BACKEND in ('locmem', 'file'):
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 5000}
+# Общий ли кэш для всех процессов сервера
+CACHE_SHARED = CACHE_BACKEND != 'locmem'
+
+# Версия справочника (core.directory) в общем кэше хранится бессрочно; в кэше процесса —
+# не дольше минуты, иначе правка, сделанная в соседнем процессе, здесь никогда не станет видна
+DIRECTORY_VERSION_TIMEOUT = None if CACHE_SHARED else 60
+
+# Сессии: cached_db читает сессию из кэша и ходит в БД только при промахе — только при общем кэше:
+# в кэше процесса выход из системы в одном процессе не отменил бы сессию в остальных.
+# signed_cookies (django.contrib.sessions.backends.signed_cookies) обходится без БД совсем,
+# но данные сессии тогда видны клиенту (подписаны, не зашифрованы) и не отзываются на сервере
+SESSION_ENGINE = config("SESSION_ENGINE", default="django.contrib.sessions.backends.cached_db" if CACHE_SHARED
+                        else "django.contrib.sessions.backends.db")
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,6 +222,21 @@ STATIC_URL = "/static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# STATIC_MANIFEST=True: collectstatic пишет файлы с хэшем в имени и сжатые копии .gz/.br (см. core.storage),
+# шаблоны ссылаются на них по манифесту. Включать только вместе с collectstatic при выкладке —
+# без staticfiles.json любой {% static %} падает. Тесты всегда идут на исходниках.
+STATIC_MANIFEST = config("STATIC_MANIFEST", default=False, cast=bool) and not TESTING
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": ("core.storage.CompressedManifestStaticFilesStorage" if STATIC_MANIFEST
+                    else "django.contrib.staticfiles.storage.StaticFilesStorage"),
+    },
+}
+
+# Раздавать STATIC_ROOT самим Django (без nginx перед приложением)
+SERVE_STATIC = config("SERVE_STATIC", default=False, cast=bool)
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
@@ -142,3 +248,48 @@ LOGIN_URL = "login"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Профилирование запросов: Server-Timing и лог медленных запросов (logs/slow_requests.log)
+REQUEST_PROFILING = config("REQUEST_PROFILING", default=False, cast=bool)
+SLOW_REQUEST_MS = config("SLOW_REQUEST_MS", default=500, cast=int)
+SLOW_REQUEST_QUERIES = config("SLOW_REQUEST_QUERIES", default=50, cast=int)
+
+# Фоновые задачи (core.jobs): исполнитель — python manage.py run_jobs
+JOB_RESULTS_DIR = config("JOB_RESULTS_DIR", default=str(BASE_DIR / "job_results"))
+JOB_STALE_SECONDS = 60 * 60  # задача "выполняется" дольше часа — исполнитель упал, вернуть в очередь
+JOB_RESULTS_TTL = 60 * 60 * 24 * 7  # сколько хранить завершённые задачи и их файлы
+# Исполнитель, не подававший признаков жизни дольше этого (с), считается остановленным —
+# задачи тогда выполняются прямо в запросе
+JOB_WORKER_TIMEOUT = 30
+
+LOG_DIR = BASE_DIR / "logs"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "timestamped": {"format": "{asctime} {levelname} {message}", "style": "{"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+        "slow_requests": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": LOG_DIR / "slow_requests.log",
+            "maxBytes": 5 * 1024 * 1024,
+            "backupCount": 5,
+            "encoding": "utf-8",
+            "delay": True,
+            "formatter": "timestamped",
+        },
+    },
+    "loggers": {
+        "core.slow_requests": {"handlers": ["slow_requests"], "level": "WARNING", "propagate": False},
+        # Строка на каждый запрос — только при разработке; тесты не засоряют вывод
+        "core.profiling": {"handlers": ["console"], "level": "DEBUG" if DEBUG and not TESTING else "INFO",
+                           "propagate": False},
+        "core.jobs": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
+if REQUEST_PROFILING:
+    LOG_DIR.mkdir(exist_ok=True)
@@ -19,10 +19,19 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from accounts.views import serve_photo_thumbnail
+
 urlpatterns = [
                   path("admin/", admin.site.urls),
                   path("accounts/", include("django.contrib.auth.urls")),
                   path("", include("core.urls")),  # Мои роуты
                   path("accounts/", include("accounts.urls")),
                   path('i18n/', include('django.conf.urls.i18n')),
-              ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+              ]
+
+# /media/ самим Django — только при разработке (static() без DEBUG ничего не добавляет), в бою его отдаёт nginx
+if settings.DEBUG:
+    # Копии фото с хэшем в имени — кэшируются браузером навсегда
+    urlpatterns.append(
+        path(f"{settings.MEDIA_URL.lstrip('/')}user_photos/thumbs/<path:path>", serve_photo_thumbnail))
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
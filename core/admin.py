@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Office, Position, Department
+from .models import Office, Position, Department, Job
 
 
 @admin.register(Office)
@@ -12,7 +12,8 @@ class OfficeAdmin(admin.ModelAdmin):
 @admin.register(Position)
 class PositionAdmin(admin.ModelAdmin):
     list_display = ("title", "department")
-    search_fields = ("department", "title")
+    list_select_related = ("department",)
+    search_fields = ("title", "department__name")
     list_filter = ("department",)
 
 
@@ -20,3 +21,12 @@ class PositionAdmin(admin.ModelAdmin):
 class DepartmentAdmin(admin.ModelAdmin):
     list_display = ("name",)
     search_fields = ("name",)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "created_by", "created_at", "finished_at")
+    list_select_related = ("created_by",)
+    raw_id_fields = ("created_by",)
+    list_filter = ("status", "kind")
+    readonly_fields = ("started_at", "finished_at")
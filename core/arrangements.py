@@ -0,0 +1,134 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.db.models.functions import Length, Trim
+from django.db.models.lookups import GreaterThan
+
+from accounts.models import Profile, Arrangement, ArrangementDaySummary
+from core.models import CENTRAL_OFFICE_NAME
+
+# Операции над таблицей расстановки целыми днями и диапазонами дней.
+# Ограничение на диапазон — чтобы случайная дата в форме не создала записи на десятилетия.
+MAX_RANGE_DAYS = 366
+BATCH_SIZE = 500
+
+
+def date_range(start, end=None):
+    """Все дни от start до end включительно"""
+    end = end or start
+    if end < start:
+        start, end = end, start
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError(f"Диапазон не может быть больше {MAX_RANGE_DAYS} дней.")
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def central_office_profiles():
+    return Profile.objects.filter(office__name=CENTRAL_OFFICE_NAME)
+
+
+def generate_arrangement_days(start, end=None):
+    """Создаёт недостающие записи расстановки на каждый день диапазона. Возвращает число новых записей"""
+    days = date_range(start, end)
+    in_range = Arrangement.objects.filter(date_create__range=(days[0], days[-1]))
+
+    with transaction.atomic():
+        before = in_range.count()
+        for day in days:
+            # Анти-join в БД: только сотрудники, у которых на этот день ещё нет записи
+            missing = central_office_profiles().filter(
+                ~Exists(Arrangement.objects.filter(profile=OuterRef("pk"), date_create=day))
+            ).values_list("id", "position_id")
+            # ignore_conflicts — на случай, если тот же день одновременно формирует другой пользователь
+            Arrangement.objects.bulk_create(
+                [Arrangement(profile_id=profile_id, position_id=position_id, date_create=day)
+                 for profile_id, position_id in missing],
+                batch_size=BATCH_SIZE, ignore_conflicts=True,
+            )
+        # Сколько строк действительно вставлено (ignore_conflicts молча пропускает чужие)
+        created = in_range.count() - before
+        if created:
+            refresh_day_summaries(days)
+    return created
+
+
+# Поля, которые переносятся при импорте дня (как и раньше — без ответственного аудитора)
+COPY_FIELDS = ("position_id", *Arrangement.EDITABLE_FIELDS)
+
+
+def copy_arrangement_day(source, start, end=None):
+    """Копирует расстановку дня source на каждый день диапазона.
+
+    Upsert по (profile, date_create): существующие записи обновляются, недостающие создаются.
+    Возвращает (число записей дня-источника, число записанных строк).
+    """
+    days = [day for day in date_range(start, end) if day != source]
+
+    with transaction.atomic():
+        source_rows = list(
+            Arrangement.objects.filter(date_create=source).values("profile_id", *COPY_FIELDS)
+        )
+        records = [Arrangement(date_create=day, **row) for day in days for row in source_rows]
+        Arrangement.objects.bulk_create(
+            records,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["date_create", "profile"],
+            update_fields=["position", *Arrangement.EDITABLE_FIELDS],
+        )
+        if records:
+            refresh_day_summaries(days)
+    return len(source_rows), len(records)
+
+
+# Сводки по дням: счётчик → ячейка, которая должна быть заполнена
+SUMMARY_COUNTERS = {
+    "on_audit": "audit_conducting",
+    "on_leave": "on_status",
+    "absent_at_check": "time_check",
+    "not_started": "time_not_start",
+}
+# Правка остальных ячеек на сводку не влияет
+SUMMARY_FIELDS = set(SUMMARY_COUNTERS.values())
+
+
+def _filled(field):
+    return GreaterThan(Length(Trim(field)), 0)
+
+
+def refresh_day_summaries(days):
+    """Пересчитывает сводки только затронутых дней — один агрегирующий запрос по индексу дня"""
+    days = sorted(set(days))
+    if not days:
+        return
+    rows = (
+        Arrangement.objects.filter(date_create__in=days, profile__office__name=CENTRAL_OFFICE_NAME)
+        .values("date_create")
+        .annotate(
+            total=Count("id"),
+            inspectors=Count("id", filter=Q(profile__is_inspector=True)),
+            **{counter: Count("id", filter=_filled(field)) for counter, field in SUMMARY_COUNTERS.items()},
+        )
+        .order_by()
+    )
+    summaries = [
+        ArrangementDaySummary(date=row.pop("date_create"), **row)
+        for row in rows
+    ]
+    with transaction.atomic():
+        ArrangementDaySummary.objects.bulk_create(
+            summaries, batch_size=BATCH_SIZE, update_conflicts=True, unique_fields=["date"],
+            update_fields=["total", "inspectors", *SUMMARY_COUNTERS, "updated_at"],
+        )
+        # Дни, где записей не осталось
+        ArrangementDaySummary.objects.filter(date__in=days).exclude(
+            date__in=[summary.date for summary in summaries]).delete()
+
+
+def summary_report(start, end):
+    """Сводки за диапазон и итоги по нему — чтение готовых строк, без просмотра расстановки"""
+    days = list(ArrangementDaySummary.objects.filter(date__range=(start, end)).order_by("date"))
+    totals = {field: sum(getattr(day, field) for day in days)
+              for field in ("total", "inspectors", *SUMMARY_COUNTERS)}
+    return days, totals
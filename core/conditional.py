@@ -0,0 +1,59 @@
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+# Условные GET-запросы: страница отдаёт ETag и Last-Modified, и повторный заход
+# с If-None-Match / If-Modified-Since получает пустой 304 без выборки данных и рендеринга.
+
+
+def request_etag(request, *parts):
+    """ETag страницы: данные (parts) + язык и cookie сессии и CSRF.
+
+    Шапка страницы зависит от пользователя, а форма выхода содержит CSRF-токен, поэтому
+    после входа, выхода или смены токена ETag меняется без запросов к БД.
+    """
+    key = "|".join(str(part) for part in (
+        *parts,
+        getattr(request, "LANGUAGE_CODE", ""),
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME, ""),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+    ))
+    return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def not_modified(request, etag, last_modified=None):
+    """Ответ 304/412, если у клиента актуальная копия, иначе None"""
+    if request.method not in ("GET", "HEAD"):
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=quote_etag(etag), last_modified=timestamp)
+    if response is not None:
+        add_validators(response, etag, last_modified)
+    return response
+
+
+def add_validators(response, etag, last_modified=None):
+    if response.status_code not in (200, 304):
+        return response
+    response.headers.setdefault("ETag", quote_etag(etag))
+    if last_modified:
+        response.headers.setdefault("Last-Modified", http_date(last_modified.timestamp()))
+    # Браузер хранит копию, но перед показом всегда сверяется с сервером
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class ConditionalGetMixin:
+    """Для CBV: get_validators() возвращает (etag, last_modified)"""
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return add_validators(response, etag, last_modified)
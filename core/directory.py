@@ -0,0 +1,167 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Prefetch
+from django.utils import timezone
+
+from accounts.models import Profile
+from accounts.search import search_profiles
+from core.models import Department, Office, Position
+
+# Кэш справочника телефонов.
+# Все ключи содержат номер версии: сигналы на Profile/Position/Department/Office увеличивают его,
+# и старые снимки просто перестают читаться (истекают сами по таймауту).
+# При нескольких процессах сервера кэш должен быть общим (CACHE_BACKEND=file или redis); с кэшем процесса
+# версия живёт DIRECTORY_VERSION_TIMEOUT секунд, и правки из соседних процессов видны с этой задержкой.
+DIRECTORY_VERSION_KEY = "directory:version"
+DIRECTORY_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+EXPORT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ais-esep-exports")
+
+
+def get_directory_version():
+    version = cache.get(DIRECTORY_VERSION_KEY)
+    if version is None:
+        # Начинаем с метки времени, чтобы после потери ключа не совпасть со старыми снимками
+        version = time.time_ns()
+        cache.add(DIRECTORY_VERSION_KEY, version, settings.DIRECTORY_VERSION_TIMEOUT)
+        version = cache.get(DIRECTORY_VERSION_KEY, version)
+    return version
+
+
+async def aget_directory_version():
+    version = await cache.aget(DIRECTORY_VERSION_KEY)
+    if version is None:
+        version = await sync_to_async(get_directory_version)()
+    return version
+
+
+def bump_directory_version():
+    try:
+        return cache.incr(DIRECTORY_VERSION_KEY)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(DIRECTORY_VERSION_KEY, version, settings.DIRECTORY_VERSION_TIMEOUT)
+        return version
+
+
+def _snapshot_key(office_id, query, version):
+    query_hash = hashlib.md5((query or "").encode("utf-8")).hexdigest()
+    return f"directory:{version}:snapshot:{office_id or 'all'}:{query_hash}"
+
+
+def build_departments_list(office_id=None, query=None):
+    """Дерево Отдел → Должность → Сотрудник в виде простых словарей (пригодно для кэша)"""
+    profiles_qs = Profile.objects.select_related("position", "office")
+
+    if query:
+        profiles_qs = search_profiles(profiles_qs, query)
+
+    if office_id:
+        profiles_qs = profiles_qs.filter(office_id=office_id)
+
+    positions_qs = Position.objects.prefetch_related(
+        Prefetch("profiles", queryset=profiles_qs, to_attr="prefetched_profiles")
+    )
+
+    departments_qs = Department.objects.prefetch_related(
+        Prefetch("positions", queryset=positions_qs, to_attr="prefetched_positions")
+    ).order_by("name")
+
+    departments_list = []
+    for dept in departments_qs:
+        employees = []
+        for pos in getattr(dept, "prefetched_positions", []):
+            for prof in getattr(pos, "prefetched_profiles", []):
+                employees.append({
+                    "profile": {
+                        "id": prof.id,
+                        "last_name": prof.last_name,
+                        "first_name": prof.first_name,
+                        "patronymic": prof.patronymic,
+                        "phone_number_work": prof.phone_number_work,
+                        "phone_number_government": prof.phone_number_government,
+                        "phone_number_mobile": prof.phone_number_mobile,
+                        "office_number": prof.office_number,
+                    },
+                    "position": {"id": pos.id, "title": pos.title},
+                })
+
+        if employees:
+            departments_list.append({"dept": {"id": dept.id, "name": dept.name}, "employees": employees})
+
+    return departments_list
+
+
+def get_departments_list(office_id=None, query=None):
+    """Снимок справочника из кэша; БД трогаем только после изменения данных"""
+    key = _snapshot_key(office_id, query, get_directory_version())
+    departments_list = cache.get(key)
+    if departments_list is None:
+        departments_list = build_departments_list(office_id, query)
+        cache.set(key, departments_list, DIRECTORY_SNAPSHOT_TIMEOUT)
+    return departments_list
+
+
+def get_offices():
+    key = f"directory:{get_directory_version()}:offices"
+    offices = cache.get(key)
+    if offices is None:
+        offices = list(Office.objects.values("id", "name", "city"))
+        cache.set(key, offices, DIRECTORY_SNAPSHOT_TIMEOUT)
+    return offices
+
+
+async def aget_offices():
+    key = f"directory:{await aget_directory_version()}:offices"
+    offices = await cache.aget(key)
+    if offices is None:
+        offices = [office async for office in Office.objects.values("id", "name", "city")]
+        await cache.aset(key, offices, DIRECTORY_SNAPSHOT_TIMEOUT)
+    return offices
+
+
+async def adirectory_last_modified(office_id=None):
+    """Время последнего изменения сотрудников (филиала): один агрегат на версию справочника"""
+    key = f"directory:{await aget_directory_version()}:modified:{office_id or 'all'}"
+    last_modified = await cache.aget(key)
+    if last_modified is None:
+        profiles = Profile.objects.all()
+        if office_id:
+            profiles = profiles.filter(office_id=office_id)
+        last_modified = (await profiles.aaggregate(last=Max("updated_at")))["last"] or ""
+        await cache.aset(key, last_modified, DIRECTORY_SNAPSHOT_TIMEOUT)
+    return last_modified or None
+
+
+def cached_export_path(write_func, prefix, suffix):
+    """Путь к готовому файлу экспорта для текущей версии данных; файл строится один раз"""
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    # Дата входит в имя: она печатается в заголовке файла
+    name = f"{prefix}-{get_directory_version()}-{timezone.localdate():%Y%m%d}{suffix}"
+    path = os.path.join(EXPORT_CACHE_DIR, name)
+    if os.path.exists(path):
+        return path
+
+    fd, tmp_path = tempfile.mkstemp(dir=EXPORT_CACHE_DIR, suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            write_func(tmp)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    # Файлы прошлых версий больше не понадобятся
+    for old_name in os.listdir(EXPORT_CACHE_DIR):
+        if old_name.startswith(f"{prefix}-") and old_name.endswith(suffix) and old_name != name:
+            try:
+                os.unlink(os.path.join(EXPORT_CACHE_DIR, old_name))
+            except OSError:
+                pass
+    return path
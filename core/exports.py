@@ -0,0 +1,287 @@
+import codecs
+import csv
+import io
+from itertools import groupby
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, PatternFill, NamedStyle
+from openpyxl.utils import get_column_letter
+from django.utils import timezone
+
+from accounts.models import Profile, Arrangement
+from core.models import CENTRAL_OFFICE_NAME
+
+CONTACTS_HEADERS = ["№", "Аты-жөнү", "Кызмат орду", "Кызматтык телефон №", "Өкмөттүк №",
+                    "Мобилдик телефон №", "Каб. №"]
+CONTACTS_WIDTHS = [5, 30, 20, 18, 15, 20, 10]
+
+# Сколько строк тянуть из БД за один запрос при потоковом экспорте
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _thin_border():
+    side = Side(border_style="thin", color="000000")
+    return Border(left=side, right=side, top=side, bottom=side)
+
+
+def _contacts_styles():
+    """Общие именованные стили книги — создаются один раз, а не на каждую ячейку"""
+    title = NamedStyle(name="contacts_title")
+    title.font = Font(name="Times New Roman", size=14, bold=True, color="AA0000")
+    title.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+
+    subtitle = NamedStyle(name="contacts_subtitle")
+    subtitle.font = Font(name="Times New Roman", size=12, italic=True, color="555555")
+    subtitle.alignment = Alignment(horizontal="center", vertical="center")
+
+    address = NamedStyle(name="contacts_address")
+    address.font = Font(name="Times New Roman", size=12, italic=True, color="AA0000")
+    address.alignment = Alignment(horizontal="center", vertical="center")
+
+    header = NamedStyle(name="contacts_header")
+    header.font = Font(name="Times New Roman", size=12, bold=True)
+    header.fill = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
+    header.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    header.border = _thin_border()
+
+    department = NamedStyle(name="contacts_department")
+    department.font = Font(name="Times New Roman", size=12, bold=True, color="000080")
+    department.fill = PatternFill(start_color="E2EFDA", end_color="E2EFDA", fill_type="solid")
+    department.alignment = Alignment(horizontal="center")
+
+    row = NamedStyle(name="contacts_row")
+    row.font = Font(name="Times New Roman", size=12)
+    row.border = _thin_border()
+    row.alignment = Alignment(vertical="center", wrap_text=True)
+
+    return [title, subtitle, address, header, department, row]
+
+
+def contacts_export_queryset():
+    return (
+        Profile.objects.filter(office__isnull=False)
+        .select_related("office", "position", "position__department")
+        .only(
+            "last_name", "first_name", "patronymic",
+            "phone_number_work", "phone_number_government", "phone_number_mobile", "office_number",
+            "office__name", "position__title", "position__department__name",
+        )
+        .order_by("office__name", "position__department__name", "last_name")
+    )
+
+
+def _styled(ws, value, style):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def _write_office_sheet(wb, office_name, profiles, date_str):
+    ws = wb.create_sheet(title=office_name[:31])  # Excel ограничивает длину имени листа
+
+    # В write-only режиме размеры колонок/строк задаются до записи ячеек
+    for i, w in enumerate(CONTACTS_WIDTHS, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = w
+    ws.row_dimensions[1].height = 40
+
+    ws.append([_styled(ws, (
+        "Кыргыз Республикасынын Эсептөө палатасынын "
+        f"{office_name} кызматкерлеринин телефондорунун жана отурган кабинеттеринин маалымдамасы"
+    ), "contacts_title")])
+    ws.merged_cells.add("A1:G1")
+
+    ws.append([_styled(ws, f"({date_str}-ж. карата)", "contacts_subtitle")])
+    ws.merged_cells.add("A2:G2")
+    row_num = 3
+
+    if CENTRAL_OFFICE_NAME in office_name:
+        ws.append([_styled(ws, "почтанын дареги: 720033, Бишкек ш., Исанов көч., 131, факс: 32 35 11",
+                           "contacts_address")])
+        ws.merged_cells.add("A3:G3")
+        row_num += 1
+
+    ws.append([_styled(ws, header, "contacts_header") for header in CONTACTS_HEADERS])
+    row_num += 1
+
+    # Профили уже отсортированы по отделу — группируем без промежуточных словарей
+    for dept_name, profs in groupby(
+            profiles,
+            key=lambda p: p.position.department.name if p.position and p.position.department else "Башка"):
+        ws.append([_styled(ws, dept_name, "contacts_department")])
+        ws.merged_cells.add(f"A{row_num}:G{row_num}")
+        row_num += 1
+
+        for i, p in enumerate(profs, start=1):
+            ws.append([_styled(ws, value, "contacts_row") for value in (
+                i,
+                p.full_name(),
+                p.position.title if p.position else "",
+                p.phone_number_work or "",
+                p.phone_number_government or "",
+                p.phone_number_mobile or "",
+                p.office_number or "",
+            )])
+            row_num += 1
+
+        ws.append([])
+        row_num += 1
+
+
+def write_contacts_workbook(stream, profiles=None):
+    """Потоковая запись справочника телефонов в xlsx (по листу на филиал)"""
+    if profiles is None:
+        profiles = contacts_export_queryset().iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    wb = openpyxl.Workbook(write_only=True)
+    for style in _contacts_styles():
+        wb.add_named_style(style)
+
+    date_str = timezone.now().strftime("%d.%m.%Y")
+    for office_name, office_profiles in groupby(profiles, key=lambda p: p.office.name):
+        _write_office_sheet(wb, office_name, office_profiles, date_str)
+
+    if not wb.worksheets:
+        wb.create_sheet(title="Маалымдама")  # книга без листов не сохраняется
+
+    wb.save(stream)
+
+
+# --- Расстановка за период ---
+
+ARRANGEMENT_EXPORT_FIELDS = (
+    "date_create", "profile__last_name", "profile__first_name", "profile__patronymic", "position__title",
+    *Arrangement.EDITABLE_FIELDS,
+    "response_audit__last_name", "response_audit__first_name",
+)
+ARRANGEMENT_WIDTHS = [12, 30, 25, 30, 30, 25, 20, 25, 25, 25, 25, 25]
+
+
+def arrangement_export_headers():
+    return ["Күнү", "Аты-жөнү", "Кызмат орду",
+            *(str(Arrangement._meta.get_field(field).verbose_name) for field in Arrangement.EDITABLE_FIELDS),
+            "Жооптуу аудитор"]
+
+
+def arrangement_export_queryset(start, end):
+    """Строки расстановки центрального аппарата за период — кортежи значений, без моделей"""
+    return (
+        Arrangement.objects.filter(date_create__range=(start, end), profile__office__name=CENTRAL_OFFICE_NAME)
+        .order_by("date_create", "profile__last_name", "profile__first_name", "id")
+        # named=True: у простого values_list aiterator() выполняет запрос прямо в цикле событий (Django 5.2)
+        .values_list(*ARRANGEMENT_EXPORT_FIELDS, named=True)
+    )
+
+
+def _arrangement_row(values):
+    day, last_name, first_name, patronymic, position, *cells, audit_last_name, audit_first_name = values
+    return [
+        day,
+        " ".join(part for part in (last_name, first_name, patronymic) if part),
+        position or "",
+        *(cell or "" for cell in cells),
+        " ".join(part for part in (audit_last_name, audit_first_name) if part),
+    ]
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer, delimiter=";").writerows(rows)  # «;» — разделитель Excel в русской локали
+    return buffer.getvalue().encode("utf-8")
+
+
+def _csv_header():
+    # BOM — чтобы Excel открыл файл как UTF-8, а не в системной кодировке
+    return codecs.BOM_UTF8 + _csv_chunk([arrangement_export_headers()])
+
+
+def iter_arrangement_csv(start, end):
+    """CSV за период порциями по EXPORT_CHUNK_SIZE строк — для WSGI"""
+    yield _csv_header()
+    batch = []
+    for values in arrangement_export_queryset(start, end).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        batch.append(_arrangement_row(values))
+        if len(batch) >= EXPORT_CHUNK_SIZE:
+            yield _csv_chunk(batch)
+            batch = []
+    if batch:
+        yield _csv_chunk(batch)
+
+
+async def aiter_arrangement_csv(start, end):
+    """То же для ASGI: синхронный итератор Django там сначала собрал бы весь файл в памяти"""
+    yield _csv_header()
+    batch = []
+    async for values in arrangement_export_queryset(start, end).aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+        batch.append(_arrangement_row(values))
+        if len(batch) >= EXPORT_CHUNK_SIZE:
+            yield _csv_chunk(batch)
+            batch = []
+    if batch:
+        yield _csv_chunk(batch)
+
+
+def _arrangement_styles():
+    header = NamedStyle(name="arrangement_header")
+    header.font = Font(name="Times New Roman", size=11, bold=True)
+    header.fill = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
+    header.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    header.border = _thin_border()
+
+    row = NamedStyle(name="arrangement_row")
+    row.font = Font(name="Times New Roman", size=11)
+    row.border = _thin_border()
+    row.alignment = Alignment(vertical="top", wrap_text=True)
+
+    day = NamedStyle(name="arrangement_date", number_format="DD.MM.YYYY")
+    day.font = row.font
+    day.border = _thin_border()
+    day.alignment = Alignment(horizontal="center", vertical="top")
+    return [header, row, day]
+
+
+def _arrangement_sheet(wb, title, with_date):
+    ws = wb.create_sheet(title=title)
+    widths = ARRANGEMENT_WIDTHS if with_date else ARRANGEMENT_WIDTHS[1:]
+    for i, w in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = w
+    ws.freeze_panes = "A2"
+    headers = arrangement_export_headers() if with_date else arrangement_export_headers()[1:]
+    ws.append([_styled(ws, header, "arrangement_header") for header in headers])
+    return ws
+
+
+def _append_arrangement_row(ws, row, with_date):
+    cells = [_styled(ws, row[0], "arrangement_date")] if with_date else []
+    cells.extend(_styled(ws, value, "arrangement_row") for value in row[1:])
+    ws.append(cells)
+
+
+def write_arrangement_workbook(stream, start, end, layout="days", rows=None):
+    """Расстановка за период в xlsx: по листу на день (layout="days") или одной таблицей ("table").
+
+    Строки читаются одним запросом по порядку дат и пишутся в write-only книгу —
+    память не зависит от длины периода.
+    """
+    if rows is None:
+        rows = (_arrangement_row(values) for values in
+                arrangement_export_queryset(start, end).iterator(chunk_size=EXPORT_CHUNK_SIZE))
+
+    wb = openpyxl.Workbook(write_only=True)
+    for style in _arrangement_styles():
+        wb.add_named_style(style)
+
+    if layout == "table":
+        ws = _arrangement_sheet(wb, "Жайгаштыруу", with_date=True)
+        for row in rows:
+            _append_arrangement_row(ws, row, with_date=True)
+    else:
+        for day, day_rows in groupby(rows, key=lambda row: row[0]):
+            ws = _arrangement_sheet(wb, day.strftime("%d.%m.%Y"), with_date=False)
+            for row in day_rows:
+                _append_arrangement_row(ws, row, with_date=False)
+
+    if not wb.worksheets:
+        _arrangement_sheet(wb, "Жайгаштыруу", with_date=layout == "table")
+
+    wb.save(stream)
@@ -0,0 +1,191 @@
+import logging
+import os
+import shutil
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import Job
+
+# Очередь фоновых задач на таблице Job — без внешнего брокера.
+# Веб-процесс только ставит задачу (enqueue), выполняет её команда run_jobs.
+# Задачу забирает тот, чей условный UPDATE status=queued → running сработал первым,
+# поэтому можно запускать несколько потоков и процессов-исполнителей.
+
+logger = logging.getLogger("core.jobs")
+
+# Тип задачи → функция(job, **params), возвращающая словарь с результатом
+JOB_HANDLERS = {}
+# Файл в JOB_RESULTS_DIR, время изменения которого — последний признак жизни run_jobs
+WORKER_HEARTBEAT_FILE = "worker.heartbeat"
+
+
+def job_handler(kind):
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, user=None, **params):
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Неизвестный тип задачи: {kind}")
+    if user is not None and not user.is_authenticated:
+        user = None
+    return Job.objects.create(kind=kind, params=params, created_by=user)
+
+
+def submit(kind, user=None, **params):
+    """Ставит задачу в очередь; если исполнитель run_jobs не запущен — выполняет её сразу.
+
+    Иначе задача висела бы в очереди, а страница ждала бы её бесконечно.
+    """
+    job = enqueue(kind, user, **params)
+    if not worker_alive():
+        logger.warning("Исполнитель фоновых задач не отвечает — задача %s #%s выполняется в запросе", kind, job.pk)
+        if Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(status=Job.RUNNING, started_at=timezone.now()):
+            job.refresh_from_db()
+            run_job(job)
+    return job
+
+
+def _heartbeat_path():
+    return os.path.join(settings.JOB_RESULTS_DIR, WORKER_HEARTBEAT_FILE)
+
+
+def worker_heartbeat():
+    """Отметка «исполнитель жив» — run_jobs обновляет её, пока работает"""
+    os.makedirs(settings.JOB_RESULTS_DIR, exist_ok=True)
+    with open(_heartbeat_path(), "a"):
+        os.utime(_heartbeat_path())
+
+
+def worker_alive():
+    try:
+        age = time.time() - os.path.getmtime(_heartbeat_path())
+    except OSError:
+        return False
+    return age < settings.JOB_WORKER_TIMEOUT
+
+
+def job_result_path(job, suffix):
+    """Файл результата задачи; хранится в JOB_RESULTS_DIR до очистки purge_finished_jobs"""
+    os.makedirs(settings.JOB_RESULTS_DIR, exist_ok=True)
+    return os.path.join(settings.JOB_RESULTS_DIR, f"{job.kind}-{job.pk}{suffix}")
+
+
+def claim_next_job():
+    """Берёт самую старую задачу из очереди или возвращает None"""
+    while True:
+        pk = (Job.objects.filter(status=Job.QUEUED)
+              .order_by("created_at", "pk").values_list("pk", flat=True).first())
+        if pk is None:
+            return None
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=timezone.now())
+        if claimed:
+            return Job.objects.get(pk=pk)
+        # Задачу перехватил другой исполнитель — пробуем следующую
+
+
+def run_job(job):
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"Неизвестный тип задачи: {job.kind}")
+        result = handler(job, **job.params)
+    except Exception as e:
+        logger.exception("Задача %s #%s завершилась ошибкой", job.kind, job.pk)
+        job.status = Job.FAILED
+        job.error = f"{type(e).__name__}: {e}"
+    else:
+        job.status = Job.DONE
+        job.result = result
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "result", "result_file", "error", "finished_at"])
+    return job
+
+
+def requeue_stale_jobs(max_age=None):
+    """Возвращает в очередь задачи, чей исполнитель упал, не успев их завершить"""
+    if max_age is None:
+        max_age = timedelta(seconds=settings.JOB_STALE_SECONDS)
+    return Job.objects.filter(status=Job.RUNNING, started_at__lt=timezone.now() - max_age).update(
+        status=Job.QUEUED, started_at=None)
+
+
+def purge_finished_jobs(max_age=None):
+    """Удаляет старые завершённые задачи вместе с файлами результатов"""
+    if max_age is None:
+        max_age = timedelta(seconds=settings.JOB_RESULTS_TTL)
+    old = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=timezone.now() - max_age)
+    for path in old.exclude(result_file="").values_list("result_file", flat=True):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    return old.delete()[0]
+
+
+# --- Задачи ---
+
+@job_handler("contacts_export")
+def export_contacts_job(job):
+    from core.directory import cached_export_path
+    from core.exports import write_contacts_workbook
+
+    # Книга строится один раз на версию справочника (её же отдаёт прямая выгрузка);
+    # задаче — своя копия, её удалит purge_finished_jobs
+    path = job_result_path(job, ".xlsx")
+    shutil.copyfile(cached_export_path(write_contacts_workbook, "contacts", ".xlsx"), path)
+    job.result_file = path
+    return {"filename": f"Справочник телефонов на {timezone.localdate():%d.%m.%Y}.xlsx"}
+
+
+def _publish_reload(days):
+    """Открытые таблицы этих дней перезагружаются, как после той же операции в запросе.
+    Лента живёт в памяти процесса (core.live): до таблиц доходит, когда задача выполнена веб-процессом
+    (без исполнителя); публикация из отдельного run_jobs остаётся в его процессе"""
+    from core.live import publish_reload
+
+    for day in days:
+        publish_reload(day)
+
+
+@job_handler("generate_arrangement")
+def generate_arrangement_job(job, date, date_to=None):
+    from core.arrangements import date_range, generate_arrangement_days
+
+    days = date_range(timezone.datetime.fromisoformat(date).date(),
+                      timezone.datetime.fromisoformat(date_to).date() if date_to else None)
+    created = generate_arrangement_days(days[0], days[-1])
+    if created:
+        _publish_reload(days)
+    return {"created": created}
+
+
+@job_handler("import_arrangement")
+def import_arrangement_job(job, source_date, target_date, target_date_to=None):
+    from core.arrangements import date_range, copy_arrangement_day
+
+    source = timezone.datetime.fromisoformat(source_date).date()
+    days = date_range(timezone.datetime.fromisoformat(target_date).date(),
+                      timezone.datetime.fromisoformat(target_date_to).date() if target_date_to else None)
+    copied, written = copy_arrangement_day(source, days[0], days[-1])
+    if written:
+        _publish_reload(day for day in days if day != source)
+    return {"copied": copied, "written": written}
+
+
+@job_handler("arrangement_export")
+def export_arrangement_job(job, date_from, date_to, layout="days"):
+    from core.exports import write_arrangement_workbook
+
+    start, end = date.fromisoformat(date_from), date.fromisoformat(date_to)
+    path = job_result_path(job, ".xlsx")
+    with open(path, "wb") as f:
+        write_arrangement_workbook(f, start, end, layout)
+    job.result_file = path
+    return {"filename": f"Жайгаштыруу {start:%d.%m.%Y}-{end:%d.%m.%Y}.xlsx"}
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+from django.db import transaction
+
+# Лента изменений расстановки для живого обновления открытых таблиц (SSE).
+# У каждого дня свой порядковый номер изменения; клиент присылает последний полученный номер
+# и получает только изменившиеся ячейки. Лента живёт в памяти процесса: при нескольких
+# процессах сервера правки из соседнего процесса сюда не попадут, а клиент, переподключившийся
+# к другому процессу, продолжает с его текущей позиции (без перезагрузки страницы).
+
+# Сколько последних изменений дня хранить для догоняющих клиентов
+FEED_HISTORY = 2000
+
+
+class ArrangementFeed:
+    def __init__(self, history=FEED_HISTORY):
+        # Метка запуска: номер изменения из другого процесса или до перезапуска к этой ленте не относится
+        self.epoch = str(time.time_ns())
+        self.history = history
+        self._lock = threading.Lock()
+        self._days = {}
+        self._waiters = set()
+
+    def _day(self, day):
+        return self._days.setdefault(str(day), {"seq": 0, "changes": deque(maxlen=self.history)})
+
+    def cursor(self, day):
+        """Текущая позиция ленты дня — с неё начинает клиент, только что загрузивший страницу"""
+        with self._lock:
+            return f"{self.epoch}:{self._day(day)['seq']}"
+
+    def publish(self, day, changes):
+        """changes — список {"id", "field", "value"}; {"reload": True} просит перезагрузить день целиком"""
+        with self._lock:
+            state = self._day(day)
+            for change in changes:
+                state["seq"] += 1
+                state["changes"].append((state["seq"], change))
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # цикл событий уже закрыт
+                pass
+
+    def since(self, day, cursor):
+        """(изменения после cursor, новый cursor); None вместо списка — история не покрывает cursor.
+
+        Курсор чужой ленты (другой процесс, перезапуск) не сравним с нашими номерами:
+        клиент просто продолжает с текущей позиции.
+        """
+        epoch, _, seq = (cursor or "").partition(":")
+        with self._lock:
+            state = self._day(day)
+            current = f"{self.epoch}:{state['seq']}"
+            try:
+                seq = int(seq)
+            except ValueError:
+                seq = None
+            if epoch != self.epoch or seq is None or seq > state["seq"]:
+                return [], current
+            changes = state["changes"]
+            if seq < state["seq"] - len(changes):
+                return None, current
+            return [change for number, change in changes if number > seq], current
+
+    async def wait(self, day, cursor, timeout):
+        """Ждёт изменений после cursor не дольше timeout секунд"""
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            # Подписываемся до проверки, чтобы не пропустить изменение между ними
+            deadline = time.monotonic() + timeout
+            changes, current = self.since(day, cursor)
+            while changes == [] and (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                # Событие общее для всех дней — проверяем, появилось ли что-то у нашего
+                event.clear()
+                changes, current = self.since(day, cursor)
+            return changes, current
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+arrangement_feed = ArrangementFeed()
+
+
+def publish_cells(day, changes):
+    """Отправить изменённые ячейки открытым таблицам дня — после фиксации транзакции"""
+    transaction.on_commit(lambda: arrangement_feed.publish(day, changes))
+
+
+def publish_reload(day):
+    transaction.on_commit(lambda: arrangement_feed.publish(day, [{"reload": True}]))
+
+
+def sse_event(data, event=None, event_id=None):
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,148 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Profile, Arrangement
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Замеряет время и число SQL-запросов основных страниц и операций расстановки. "
+            "Запускайте на базе, заполненной generate_synthetic_data: результаты разных коммитов "
+            "сравнимы при одинаковых параметрах генерации")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Сколько замеров на сценарий")
+        parser.add_argument("--output", help="Сохранить результаты в JSON")
+        parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+        parser.add_argument("--only", nargs="*", help="Запустить только перечисленные сценарии")
+
+    def handle(self, *args, **options):
+        day = Arrangement.objects.aggregate(last=Max("date_create"))["last"]
+        if day is None or not Profile.objects.exists():
+            raise CommandError("База пуста — сначала выполните generate_synthetic_data.")
+
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else "localhost")
+        results = {}
+        for name, run, writes in self.scenarios(client, day):
+            if options["only"] and name not in options["only"]:
+                continue
+            results[name] = self.measure(run, options["repeat"], writes)
+            self.print_result(name, results[name])
+
+        report = {
+            "commit": self.git_commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "scale": {
+                "profiles": Profile.objects.count(),
+                "arrangements": Arrangement.objects.count(),
+            },
+            "results": results,
+        }
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as f:
+                self.print_comparison(json.load(f), report)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Результаты сохранены в {options['output']}")
+
+    def scenarios(self, client, day):
+        """(имя, функция, пишет ли в БД) — пишущие сценарии откатываются после каждого замера"""
+        previous = day - timedelta(days=1)
+        new_day = day + timedelta(days=1)
+
+        def get(url, params=None, cold=False):
+            def run():
+                if cold:
+                    cache.clear()
+                response = client.get(url, params or {})
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                return response
+            return run
+
+        def post(url, data):
+            return lambda: client.post(url, data)
+
+        return [
+            ("contacts_cold", get("/contacts/", cold=True), False),
+            ("contacts_warm", get("/contacts/"), False),
+            ("contacts_search", get("/contacts/", {"q": "сакиев"}, cold=True), False),
+            ("employee_list", get("/employee_list/"), False),
+            ("employee_list_search", get("/employee_list/", {"q": "мирлан"}), False),
+            ("arrangement_day", get("/arrangement/", {"date": day.isoformat()}), False),
+            ("contacts_export_cold", get("/contacts/export/", cold=True), False),
+            ("arrangement_generate", post("/arrangement/generate-day/", {"date": new_day.isoformat()}), True),
+            ("arrangement_import", post("/arrangement/import-day/", {
+                "source_date": previous.isoformat(), "target_date": day.isoformat()}), True),
+            ("arrangement_clear", post("/arrangement/clear-day/", {"date": day.isoformat()}), True),
+        ]
+
+    def measure(self, run, repeat, writes):
+        timings = []
+        queries = []
+        status = None
+        for _ in range(repeat + 1):  # первый прогон — прогрев
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                if writes:
+                    try:
+                        with transaction.atomic():
+                            response = run()
+                            raise _Rollback
+                    except _Rollback:
+                        pass
+                else:
+                    response = run()
+                elapsed = time.perf_counter() - start
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+            status = response.status_code
+
+        timings = timings[1:]
+        return {
+            "status": status,
+            "median_ms": round(statistics.median(timings), 2),
+            "min_ms": round(min(timings), 2),
+            "max_ms": round(max(timings), 2),
+            "queries": queries[-1],
+        }
+
+    def print_result(self, name, result):
+        self.stdout.write(f"{name:<24} {result['median_ms']:>10.2f} ms (min {result['min_ms']:.2f}) "
+                          f"{result['queries']:>5} queries  [{result['status']}]")
+
+    def print_comparison(self, before, after):
+        self.stdout.write(f"\nСравнение с {before.get('commit') or '?'}:")
+        for name, result in after["results"].items():
+            old = before.get("results", {}).get(name)
+            if not old:
+                continue
+            change = (result["median_ms"] - old["median_ms"]) / old["median_ms"] * 100 if old["median_ms"] else 0
+            self.stdout.write(f"{name:<24} {old['median_ms']:>10.2f} → {result['median_ms']:.2f} ms "
+                              f"({change:+.1f}%), запросов {old['queries']} → {result['queries']}")
+
+    def git_commit(self):
+        try:
+            return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,141 @@
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import Profile, Arrangement
+from accounts.search import profile_search_document, rebuild_search_index
+from core.directory import bump_directory_version
+from core.models import Office, Department, Position, CENTRAL_OFFICE_NAME
+
+LAST_NAMES = ["Абдыкасымов", "Сакиев", "Токтоналиев", "Искитов", "Турсунбаев", "Жумабеков", "Осмонов",
+              "Асанов", "Мамытов", "Бакиров", "Кулназаров", "Ниязбеков", "Эркинбеков", "Үсөнов", "Өмүрзаков"]
+FIRST_NAMES_MALE = ["Мирлан", "Асан", "Батыр", "Нурлан", "Азамат", "Эрлан", "Тилек", "Бакыт", "Үмөт"]
+FIRST_NAMES_FEMALE = ["Айгүл", "Эркингүл", "Нуриза", "Жылдыз", "Айпери", "Гүлнара", "Асель", "Мээрим"]
+PATRONYMICS_MALE = ["Казыбекович", "Саматович", "Эгимбаевич", "Асанович", "Токтогулович"]
+PATRONYMICS_FEMALE = ["Насирдиновна", "Казыбековна", "Саматовна", "Асановна", "Бакытовна"]
+REGIONS = ["Бишкек ш., Чүй жана Талас обл. АБ", "Ысык-Көл жана Нарын обл. АБ", "Ош ш., ОЖБ обл. АБ",
+           "Баткен обл. АБ", "Жалал-Абад обл. АБ"]
+TITLES = ["Аудитор", "Башкы аудитор", "Жетектөөчү аудитор", "Башкы адис", "Жетектөөчү адис",
+          "Бөлүм башчысы", "Башкармалык башчысы", "Инспектор", "Кеңешчи", "Юрист"]
+STATUSES = ["", "", "", "", "Эмгек өргүүдө", "Оорулуу", "Окууда"]
+
+
+def make_pin(rng, gender, birth_date):
+    """14 цифр: пол (1 — жен., 2 — муж.), дата рождения ДДММГГГГ и пять случайных цифр"""
+    first = "1" if gender == "female" else "2"
+    return f"{first}{birth_date:%d%m%Y}{rng.randrange(100000):05d}"
+
+
+class Command(BaseCommand):
+    help = ("Заполняет базу синтетическими данными для нагрузочных замеров: "
+            "филиалы, отделы, должности, сотрудники с корректными ПИН и годы расстановки")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--offices", type=int, default=5)
+        parser.add_argument("--departments", type=int, default=40)
+        parser.add_argument("--positions", type=int, default=120)
+        parser.add_argument("--profiles", type=int, default=2000)
+        parser.add_argument("--central-share", type=float, default=0.2,
+                            help="Доля сотрудников центрального аппарата (для расстановки)")
+        parser.add_argument("--years", type=int, default=1, help="Сколько лет расстановки создать")
+        parser.add_argument("--seed", type=int, default=42, help="Одинаковый seed — одинаковые данные")
+        parser.add_argument("--append", action="store_true",
+                            help="Разрешить запуск на непустой базе")
+
+    def handle(self, *args, **options):
+        if Profile.objects.exists() and not options["append"]:
+            raise CommandError("В базе уже есть сотрудники. Запустите на отдельной базе или добавьте --append.")
+
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            offices = self.create_offices(options["offices"])
+            positions = self.create_positions(rng, options["departments"], options["positions"])
+            central = self.create_profiles(rng, offices, positions, options["profiles"], options["central_share"])
+            arrangements = self.create_arrangements(rng, central, options["years"])
+
+        # bulk_create не вызывает save() и сигналы — индекс поиска и кэш справочника обновляем явно
+        rebuild_search_index()
+        bump_directory_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано: филиалов {len(offices)}, должностей {len(positions)}, "
+            f"сотрудников {options['profiles']}, записей расстановки {arrangements}"
+        ))
+
+    def create_offices(self, count):
+        offices = [Office.objects.get_or_create(name=CENTRAL_OFFICE_NAME,
+                                                defaults={"city": "Бишкек", "address": "Исанов көч., 131"})[0]]
+        for i in range(1, count):
+            region = REGIONS[(i - 1) % len(REGIONS)]
+            name = region if i <= len(REGIONS) else f"{region} {i}"
+            offices.append(Office.objects.create(name=name, city=name.split()[0], address="-"))
+        return offices
+
+    def create_positions(self, rng, departments_count, positions_count):
+        departments = Department.objects.bulk_create(
+            [Department(name=f"Бөлүм {i + 1:03d}") for i in range(departments_count)]
+        )
+        return Position.objects.bulk_create([
+            Position(title=rng.choice(TITLES), department=rng.choice(departments))
+            for _ in range(positions_count)
+        ])
+
+    def create_profiles(self, rng, offices, positions, count, central_share):
+        used_pins = set(Profile.objects.exclude(pin=None).values_list("pin", flat=True))
+        profiles = []
+        for i in range(count):
+            gender = rng.choice(["male", "female"])
+            birth_date = date(1960, 1, 1) + timedelta(days=rng.randrange(40 * 365))
+            pin = make_pin(rng, gender, birth_date)
+            while pin in used_pins:
+                pin = make_pin(rng, gender, birth_date)
+            used_pins.add(pin)
+
+            male = gender == "male"
+            profile = Profile(
+                last_name=rng.choice(LAST_NAMES) + ("" if male else "а"),
+                first_name=rng.choice(FIRST_NAMES_MALE if male else FIRST_NAMES_FEMALE),
+                patronymic=rng.choice(PATRONYMICS_MALE if male else PATRONYMICS_FEMALE),
+                pin=pin,
+                birth_date=birth_date,
+                gender=gender,
+                position=rng.choice(positions),
+                office=offices[0] if rng.random() < central_share else rng.choice(offices[1:] or offices),
+                email=f"user{i}@esep.kg",
+                phone_number_work=f"62 {rng.randrange(100):02d} {rng.randrange(100):02d}",
+                phone_number_mobile=f"0{rng.choice([555, 700, 550, 770])} {rng.randrange(1000000):06d}",
+                phone_number_government=f"{rng.randrange(1000):03d}",
+                office_number=str(rng.randrange(1, 400)),
+                status=rng.choice(["active"] * 8 + ["vacation", "fired"]),
+                is_inspector=rng.random() < 0.3,
+            )
+            profile.search_text = profile_search_document(profile)
+            profiles.append(profile)
+
+        Profile.objects.bulk_create(profiles, batch_size=1000)
+        return list(Profile.objects.filter(office=offices[0]).values_list("id", "position_id"))
+
+    def create_arrangements(self, rng, central, years):
+        """Рабочие дни за последние years лет, по строке на сотрудника центрального аппарата"""
+        end = date.today()
+        day = end - timedelta(days=365 * years)
+        total = 0
+        batch = []
+        while day <= end:
+            if day.weekday() < 5:
+                for profile_id, position_id in central:
+                    batch.append(Arrangement(
+                        profile_id=profile_id, position_id=position_id, date_create=day,
+                        on_status=rng.choice(STATUSES),
+                        time_check=rng.choice(["", "", "", "Келген жок"]),
+                        audit_conducting=rng.choice(["", "", "Аудит"]),
+                    ))
+                if len(batch) >= 5000:
+                    Arrangement.objects.bulk_create(batch, batch_size=1000, ignore_conflicts=True)
+                    total += len(batch)
+                    batch = []
+            day += timedelta(days=1)
+        Arrangement.objects.bulk_create(batch, batch_size=1000, ignore_conflicts=True)
+        return total + len(batch)
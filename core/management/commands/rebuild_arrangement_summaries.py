@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from accounts.models import Arrangement, ArrangementDaySummary
+from core.arrangements import refresh_day_summaries, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = ("Пересчитывает дневные сводки расстановки (для отчёта статистики). "
+            "Нужен один раз для уже накопленной истории и после массовых правок в обход приложения")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+        parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+
+    def handle(self, *args, **options):
+        bounds = Arrangement.objects.aggregate(first=Min("date_create"), last=Max("date_create"))
+        start = options["date_from"] or bounds["first"]
+        end = options["date_to"] or bounds["last"]
+        if start is None or end is None:
+            raise CommandError("Расстановка пуста — пересчитывать нечего.")
+
+        days = list(Arrangement.objects.filter(date_create__range=(start, end))
+                    .values_list("date_create", flat=True).distinct().order_by("date_create"))
+        for i in range(0, len(days), BATCH_SIZE):
+            refresh_day_summaries(days[i:i + BATCH_SIZE])
+        # Сводки дней, от которых не осталось записей
+        existing = set(days)
+        stale = [summary_date for summary_date in ArrangementDaySummary.objects.filter(date__range=(start, end))
+                 .values_list("date", flat=True) if summary_date not in existing]
+        for i in range(0, len(stale), BATCH_SIZE):
+            ArrangementDaySummary.objects.filter(date__in=stale[i:i + BATCH_SIZE]).delete()
+
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано дней: {len(days)}, удалено пустых сводок: {len(stale)}"))
@@ -0,0 +1,68 @@
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from core.jobs import claim_next_job, run_job, requeue_stale_jobs, purge_finished_jobs, worker_heartbeat
+
+
+class Command(BaseCommand):
+    help = ("Исполнитель фоновых задач (экспорт, формирование и импорт расстановки). "
+            "Держите запущенным рядом с веб-сервером; можно запускать несколько экземпляров")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="Число потоков-исполнителей")
+        parser.add_argument("--poll", type=float, default=1.0, help="Пауза между проверками очереди, с")
+        parser.add_argument("--once", action="store_true",
+                            help="Выполнить всё, что в очереди, в текущем потоке и выйти")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        purged = purge_finished_jobs()
+        if requeued or purged:
+            self.stdout.write(f"Возвращено в очередь: {requeued}, удалено старых задач: {purged}")
+
+        if options["once"]:
+            done = 0
+            while job := claim_next_job():
+                self.report(run_job(job))
+                done += 1
+            self.stdout.write(self.style.SUCCESS(f"Выполнено задач: {done}"))
+            return
+
+        stop = threading.Event()
+        threads = [threading.Thread(target=self.work, args=(stop, options["poll"]), daemon=True,
+                                    name=f"job-worker-{i}") for i in range(max(options["workers"], 1))]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Исполнителей: {len(threads)}. Ctrl+C — остановить после текущих задач.")
+        try:
+            while any(thread.is_alive() for thread in threads):
+                # Веб-процесс видит, что исполнитель жив, и ставит задачи в очередь, а не выполняет сам
+                worker_heartbeat()
+                for thread in threads:
+                    thread.join(1)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def work(self, stop, poll):
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                job = claim_next_job()
+                if job is None:
+                    stop.wait(poll)
+                    continue
+                self.report(run_job(job))
+        finally:
+            connection.close()
+
+    def report(self, job):
+        duration = (job.finished_at - job.started_at).total_seconds() if job.started_at else 0
+        message = f"{job.kind} #{job.pk}: {job.status} за {duration:.1f} с"
+        if job.error:
+            self.stderr.write(f"{message} — {job.error}")
+        else:
+            self.stdout.write(message)
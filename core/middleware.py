@@ -0,0 +1,286 @@
+import json
+import logging
+import mimetypes
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+logger = logging.getLogger("core.profiling")
+slow_logger = logging.getLogger("core.slow_requests")
+
+
+class _QueryTimer:
+    """execute_wrapper: считает запросы и время в БД без DEBUG=True"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestProfilingMiddleware:
+    """Замер запроса: число SQL-запросов, время в БД, время рендеринга шаблона и размер ответа.
+
+    Включается настройкой REQUEST_PROFILING. Добавляет заголовок Server-Timing,
+    медленные запросы пишет в лог core.slow_requests, сводку по имени URL хранит в stats
+    (смотреть на /profiling/, только для персонала).
+    """
+
+    stats = {}
+    _stats_lock = threading.Lock()
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        # Под ASGI работаем в цикле событий: без лишнего перехода в поток и обратно на каждый запрос
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.slow_ms = getattr(settings, "SLOW_REQUEST_MS", 500)
+        self.slow_queries = getattr(settings, "SLOW_REQUEST_QUERIES", 50)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timer = _QueryTimer()
+        request._profiling_render = 0.0
+        start = time.perf_counter()
+        with self.timed_connections(timer):
+            response = self.get_response(request)
+        self.record(request, response, timer, request._profiling_render, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        timer = _QueryTimer()
+        request._profiling_render = 0.0
+        start = time.perf_counter()
+        # Соединения с БД живут в потоке, где ORM выполняет запросы (sync_to_async с thread_sensitive —
+        # один поток на запрос), поэтому обёртку ставим и снимаем там же: два перехода вместо обёртки
+        # всего запроса в async_to_sync
+        stack = await sync_to_async(self.timed_connections)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.record(request, response, timer, request._profiling_render, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def timed_connections(timer):
+        stack = ExitStack()
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(timer))
+        return stack
+
+    @classmethod
+    def snapshot(cls):
+        """Копия stats со средними на запрос; счётчики свои у каждого процесса сервера"""
+        with cls._stats_lock:
+            entries = {url_name: dict(entry) for url_name, entry in cls.stats.items()}
+        for entry in entries.values():
+            for field in ("queries", "db_ms", "render_ms", "total_ms", "bytes"):
+                entry[f"avg_{field}"] = round(entry[field] / entry["requests"], 1)
+        return entries
+
+    def process_template_response(self, request, response):
+        # TemplateResponse рендерится после этого хука — засекаем время до и после рендеринга
+        start = time.perf_counter()
+
+        def rendered(response):
+            request._profiling_render += time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request, response, timer, render, total):
+        match = request.resolver_match
+        url_name = match.view_name if match else "-"
+        size = len(response.content) if not response.streaming else None
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries"',
+            f"render;dur={render * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+
+        with self._stats_lock:
+            entry = self.stats.setdefault(url_name, {"requests": 0, "queries": 0, "db_ms": 0.0,
+                                                     "render_ms": 0.0, "total_ms": 0.0, "bytes": 0})
+            entry["requests"] += 1
+            entry["queries"] += timer.count
+            entry["db_ms"] += timer.duration * 1000
+            entry["render_ms"] += render * 1000
+            entry["total_ms"] += total * 1000
+            entry["bytes"] += size or 0
+
+        message = "%s %s [%s] %s: %.1f ms, %d queries (%.1f ms), render %.1f ms, %s bytes"
+        args = (request.method, request.get_full_path(), url_name, response.status_code, total * 1000,
+                timer.count, timer.duration * 1000, render * 1000, size if size is not None else "stream")
+        if total * 1000 >= self.slow_ms or timer.count >= self.slow_queries:
+            slow_logger.warning(message, *args)
+        else:
+            logger.debug(message, *args)
+
+
+def _accepted_encodings(header):
+    """Кодировки из Accept-Encoding с ненулевым q; «*» разрешает всё, что не запрещено явно"""
+    accepted, refused, wildcard = set(), set(), False
+    for item in header.split(","):
+        token, _, params = item.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if token == "*":
+            wildcard = q > 0
+        elif q > 0:
+            accepted.add(token)
+        else:
+            refused.add(token)
+    if wildcard:
+        accepted |= {"br", "gzip"} - refused
+    return accepted
+
+
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+async def aiter_file(f, chunk_size=FILE_CHUNK_SIZE):
+    """Файл порциями для ответа под ASGI: чтение с диска в потоке, в памяти не больше одной порции"""
+    try:
+        while chunk := await sync_to_async(f.read, thread_sensitive=False)(chunk_size):
+            yield chunk
+    finally:
+        f.close()
+
+
+class _StaticFile:
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.immutable = immutable
+        self.last_modified = int(stat.st_mtime)
+        self.etag = f'"{stat.st_size:x}-{self.last_modified:x}"'
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        # Заранее сжатые копии (см. core.storage) в порядке предпочтения
+        self.encodings = [(encoding, path + suffix) for encoding, suffix in (("br", ".br"), ("gzip", ".gz"))
+                          if os.path.exists(path + suffix)]
+
+
+class StaticFilesMiddleware:
+    """Отдаёт STATIC_ROOT прямо из процесса Django, когда перед ним нет nginx.
+
+    Включается настройкой SERVE_STATIC. Файлы с хэшем в имени (из манифеста collectstatic)
+    кэшируются браузером на год без перепроверки, остальные — с проверкой по ETag.
+    Если клиент принимает br/gzip, отдаётся готовая сжатая копия.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "SERVE_STATIC", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.prefix = "/" + settings.STATIC_URL.strip("/") + "/"
+        self.files = self.scan(settings.STATIC_ROOT)
+
+    def scan(self, root):
+        """Индекс файлов строится один раз при старте — после collectstatic нужен перезапуск"""
+        root = str(root)
+        try:
+            with open(os.path.join(root, "staticfiles.json"), encoding="utf-8") as f:
+                hashed = set(json.load(f).get("paths", {}).values())
+        except (OSError, ValueError):
+            hashed = set()
+
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith((".gz", ".br")) and os.path.exists(os.path.join(directory, name[:-3])):
+                    continue
+                path = os.path.join(directory, name)
+                url = os.path.relpath(path, root).replace(os.sep, "/")
+                files[url] = _StaticFile(path, url in hashed)
+        return files
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        static_file = self.find(request)
+        if static_file is not None:
+            return self.serve(request, static_file)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        static_file = self.find(request)
+        if static_file is not None:
+            return self.serve(request, static_file, asynchronous=True)
+        return await self.get_response(request)
+
+    def find(self, request):
+        if request.method in ("GET", "HEAD") and request.path_info.startswith(self.prefix):
+            return self.files.get(request.path_info[len(self.prefix):])
+        return None
+
+    def serve(self, request, static_file, asynchronous=False):
+        response = get_conditional_response(request, etag=static_file.etag,
+                                            last_modified=static_file.last_modified)
+        if response is None:
+            accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+            path, encoding = static_file.path, None
+            for candidate, candidate_path in static_file.encodings:
+                if candidate in accepted:
+                    path, encoding = candidate_path, candidate
+                    break
+            f = open(path, "rb")
+            if asynchronous:
+                # Синхронный итератор FileResponse под ASGI Django прочитал бы целиком
+                response = StreamingHttpResponse(aiter_file(f), content_type=static_file.content_type)
+                response["Content-Length"] = os.fstat(f.fileno()).st_size
+            else:
+                response = FileResponse(f, content_type=static_file.content_type)
+                # FileResponse подставляет имя файла — для статики оно не нужно
+                del response["Content-Disposition"]
+            if encoding:
+                response["Content-Encoding"] = encoding
+
+        response["ETag"] = static_file.etag
+        response["Last-Modified"] = http_date(static_file.last_modified)
+        if static_file.encodings:
+            response["Vary"] = "Accept-Encoding"
+        if static_file.immutable:
+            response["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response["Cache-Control"] = "public, max-age=60"
+        return response
@@ -1,6 +1,9 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+# Филиал, для которого ведётся расстановка
+CENTRAL_OFFICE_NAME = "Борбордук аппарат"
+
 
 class Department(models.Model):
     name = models.CharField(_("Отдел"), max_length=255)
@@ -24,9 +27,42 @@ class Position(models.Model):
 
 
 class Office(models.Model):
-    name = models.CharField(_("Название филиала"), max_length=150)
+    name = models.CharField(_("Название филиала"), max_length=150, db_index=True)
     city = models.CharField(_("Город"), max_length=100)
     address = models.TextField(_("Адрес"))
 
     def __str__(self):
         return f"{self.name} ({self.city})"
+
+
+class Job(models.Model):
+    """Фоновая задача (экспорт, формирование и импорт расстановки); выполняется командой run_jobs"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, _("В очереди")),
+        (RUNNING, _("Выполняется")),
+        (DONE, _("Готово")),
+        (FAILED, _("Ошибка")),
+    ]
+
+    kind = models.CharField(_("Тип задачи"), max_length=50)
+    params = models.JSONField(_("Параметры"), default=dict, blank=True)
+    status = models.CharField(_("Статус"), max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.JSONField(_("Результат"), null=True, blank=True)
+    result_file = models.CharField(_("Файл результата"), max_length=255, blank=True)
+    error = models.TextField(_("Ошибка"), blank=True)
+    created_by = models.ForeignKey("auth.User", on_delete=models.SET_NULL, null=True, blank=True,
+                                   verbose_name=_("Автор"))
+    created_at = models.DateTimeField(_("Создана"), auto_now_add=True)
+    started_at = models.DateTimeField(_("Начата"), null=True, blank=True)
+    finished_at = models.DateTimeField(_("Завершена"), null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "created_at"], name="job_status_created_idx")]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
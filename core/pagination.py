@@ -0,0 +1,123 @@
+import base64
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Keyset-пагинация: следующая страница начинается строго после последней строки предыдущей,
+# поэтому БД не пересчитывает OFFSET и не делает COUNT(*) на каждую страницу.
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    """Возвращает значения ключа или None, если курсор битый"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _after(fields, values):
+    """(a, b, c) > (x, y, z) в виде Q — работает на любой СУБД и использует индекс по ключу"""
+    condition = Q()
+    for i, field in enumerate(fields):
+        step = Q(**{f"{field}__gt": values[i]})
+        for prev_field, prev_value in zip(fields[:i], values[:i]):
+            step &= Q(**{prev_field: prev_value})
+        condition |= step
+    return condition
+
+
+def _keyset_queryset(queryset, fields, cursor, page_size):
+    queryset = queryset.order_by(*fields)
+    values = decode_cursor(cursor, len(fields))
+    if values is not None:
+        queryset = queryset.filter(_after(fields, values))
+    # Берём на одну строку больше, чтобы узнать, есть ли следующая страница
+    return queryset[:page_size + 1]
+
+
+def _keyset_page(rows, fields, page_size):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, field) for field in fields])
+    return KeysetPage(rows, next_cursor)
+
+
+def keyset_paginate(queryset, fields, cursor=None, page_size=50):
+    """Страница queryset, упорядоченного по fields (последним полем должен быть уникальный ключ)"""
+    rows = list(_keyset_queryset(queryset, fields, cursor, page_size))
+    return _keyset_page(rows, fields, page_size)
+
+
+async def akeyset_paginate(queryset, fields, cursor=None, page_size=50):
+    """То же для асинхронных представлений"""
+    rows = [row async for row in _keyset_queryset(queryset, fields, cursor, page_size)]
+    return _keyset_page(rows, fields, page_size)
+
+
+# --- Оценка числа строк для админки ---
+
+def estimated_row_count(model, using="default"):
+    """Число строк таблицы по статистике СУБД (без COUNT(*)); None, если статистики нет"""
+    conn = connections[using]
+    table = model._meta.db_table
+    with conn.cursor() as cursor:
+        if conn.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        elif conn.vendor == "mysql":
+            cursor.execute("SELECT table_rows FROM information_schema.tables "
+                           "WHERE table_schema = DATABASE() AND table_name = %s", [table])
+        elif conn.vendor == "sqlite":
+            # sqlite_stat1 появляется после ANALYZE или PRAGMA optimize
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    # В sqlite_stat1 первое число строки stat — размер таблицы
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None  # reltuples = -1: таблицу ещё не анализировали
+
+
+class EstimatedCountPaginator(Paginator):
+    """Паджинатор списков админки: для большой таблицы без фильтров берёт оценку вместо COUNT(*)"""
+    # На таблицах меньше этого точный подсчёт дешёвый — оценка не нужна
+    estimate_threshold = 100_000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, "query", None)
+        if query is not None and not query.where:
+            estimate = estimated_row_count(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+        return super().count
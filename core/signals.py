@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.models import Profile
+from core.directory import bump_directory_version
+from core.models import Department, Office, Position
+
+
+@receiver([post_save, post_delete], sender=Profile)
+@receiver([post_save, post_delete], sender=Position)
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Office)
+def invalidate_directory(sender, **kwargs):
+    """Любое изменение справочных данных делает кэш справочника устаревшим"""
+    bump_directory_version()
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Настройка нового соединения с SQLite: WAL, synchronous, busy_timeout, mmap и размер кэша"""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,48 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него собираются только .gz
+    brotli = None
+
+# Статика с хэшем содержимого в имени (style.3f2a9c.css) и заранее сжатыми копиями .gz/.br.
+# Копии строятся один раз при collectstatic; отдаёт их core.middleware.StaticFilesMiddleware
+# или фронтовый сервер (nginx gzip_static/brotli_static).
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".webmanifest", ".txt", ".html", ".map", ".ico", ".xml"}
+# Меньше этого сжимать нет смысла — заголовки съедят выигрыш
+MIN_COMPRESS_SIZE = 256
+
+
+def compress_file(path):
+    """Пишет path.gz и path.br рядом с файлом, если они заметно меньше; возвращает созданные пути"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) < len(data) * 0.95:
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # hashed_files заполнен после всех проходов — сжимаем окончательные версии файлов
+        for hashed_name in set(self.hashed_files.values()):
+            if os.path.splitext(hashed_name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                compress_file(self.path(hashed_name))
@@ -1,3 +1,808 @@
-from django.test import TestCase
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from concurrent.futures import ThreadPoolExecutor
+import json
+import time
+from unittest.mock import patch
 
-# Create your tests here.
+import openpyxl
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command, CommandError
+from django.db import connection, connections
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Profile, Arrangement, ArrangementDaySummary
+from core.arrangements import generate_arrangement_days, copy_arrangement_day
+from core.directory import bump_directory_version, get_directory_version, get_departments_list
+from core.exports import CONTACTS_HEADERS, write_contacts_workbook
+from core.jobs import enqueue, worker_heartbeat
+from core.live import arrangement_feed
+from core.middleware import RequestProfilingMiddleware
+from core.models import Office, Position, Department, Job, CENTRAL_OFFICE_NAME
+from core.pagination import encode_cursor, decode_cursor, keyset_paginate
+from core.storage import compress_file
+from core.views import ProfileOfficesListView
+
+
+def make_staff(count=5):
+    office = Office.objects.create(name=CENTRAL_OFFICE_NAME, city="Бишкек", address="Исанова 131")
+    other = Office.objects.create(name="Ош", city="Ош", address="-")
+    department = Department.objects.create(name="Отдел аудита")
+    position = Position.objects.create(title="Аудитор", department=department)
+    profiles = [
+        Profile.objects.create(last_name=f"Фамилия{i}", first_name=f"Имя{i}",
+                               office=office, position=position, is_inspector=i % 2 == 0)
+        for i in range(count)
+    ]
+    Profile.objects.create(last_name="Ошский", first_name="Сотрудник", office=other, position=position)
+    return office, position, profiles
+
+
+class ArrangementQueryPlanTests(TestCase):
+    """Выборки по дню должны идти по индексу, а не сканировать всю историю"""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_staff()
+        start = date(2023, 1, 1)
+        for offset in range(0, 3 * 365, 180):
+            generate_arrangement_days(start + timedelta(days=offset), start + timedelta(days=offset + 30))
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return " | ".join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queryset, table="accounts_arrangement"):
+        if connection.vendor != "sqlite":
+            self.skipTest("EXPLAIN QUERY PLAN есть только в SQLite")
+        plan = self.query_plan(queryset)
+        self.assertNotRegex(plan, rf"SCAN {table}\b(?! USING)", plan)
+        self.assertIn("INDEX", plan)
+
+    def test_day_lookup_uses_index(self):
+        self.assertUsesIndex(Arrangement.objects.filter(date_create=date(2023, 1, 5)))
+
+    def test_range_lookup_uses_index(self):
+        self.assertUsesIndex(
+            Arrangement.objects.filter(date_create__range=(date(2023, 1, 1), date(2023, 1, 31)))
+        )
+
+    def test_arrangement_page_query_uses_index(self):
+        self.assertUsesIndex(
+            Arrangement.objects.filter(date_create=date(2023, 1, 5), profile__office__name=CENTRAL_OFFICE_NAME)
+            .select_related("profile", "position")
+            .order_by("profile__last_name", "profile__first_name")
+        )
+
+    def test_office_lookup_by_name_uses_index(self):
+        self.assertUsesIndex(Office.objects.filter(name=CENTRAL_OFFICE_NAME), table="core_office")
+
+
+class ArrangementOperationsTests(TestCase):
+    def setUp(self):
+        self.office, self.position, self.profiles = make_staff()
+
+    def test_generate_range_skips_existing_and_other_offices(self):
+        self.assertEqual(generate_arrangement_days(date(2024, 3, 1)), 5)
+        self.assertEqual(generate_arrangement_days(date(2024, 3, 1), date(2024, 3, 10)), 45)
+        self.assertEqual(Arrangement.objects.count(), 50)
+        self.assertFalse(Arrangement.objects.exclude(profile__office=self.office).exists())
+
+    def test_copy_day_upserts_into_range(self):
+        source = date(2024, 3, 1)
+        generate_arrangement_days(source, date(2024, 3, 2))
+        Arrangement.objects.filter(date_create=source).update(on_status="Өргүүдө")
+        Arrangement.objects.filter(date_create=date(2024, 3, 2)).update(time_check="9:15")
+
+        copied, written = copy_arrangement_day(source, date(2024, 3, 2), date(2024, 3, 4))
+
+        self.assertEqual((copied, written), (5, 15))
+        self.assertEqual(Arrangement.objects.count(), 20)
+        self.assertEqual(Arrangement.objects.filter(on_status="Өргүүдө").count(), 20)
+        self.assertFalse(Arrangement.objects.filter(time_check="9:15").exists())
+
+    def test_copy_skips_source_day_and_counts_rows(self):
+        source = date(2024, 3, 2)
+        generate_arrangement_days(source)
+        self.assertEqual(copy_arrangement_day(source, date(2024, 3, 1), date(2024, 3, 3)), (5, 10))
+        self.assertEqual(copy_arrangement_day(date(2024, 2, 1), date(2024, 3, 5)), (0, 0))
+        self.assertEqual(ArrangementDaySummary.objects.filter(total=5).count(), 3)
+
+    def test_copy_queries_do_not_grow_with_staff(self):
+        source = date(2024, 3, 1)
+        generate_arrangement_days(source)
+        with CaptureQueriesContext(connection) as small:
+            copy_arrangement_day(source, date(2024, 3, 2))
+        for i in range(20):
+            Profile.objects.create(last_name=f"Кошумча{i}", first_name="Аты", office=self.office,
+                                   position=self.position)
+        generate_arrangement_days(source)
+        with CaptureQueriesContext(connection) as large:
+            copy_arrangement_day(source, date(2024, 3, 2))
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(Arrangement.objects.filter(date_create=date(2024, 3, 2)).count(), 25)
+
+    def test_import_view_reports_copied_rows(self):
+        generate_arrangement_days(date(2024, 3, 1))
+        response = self.client.post("/arrangement/import-day/", {
+            "source_date": "2024-03-01", "target_date": "2024-03-02"})
+        self.assertEqual([str(m) for m in get_messages(response.wsgi_request)],
+                         ["Импортировано 5 записей из 01.03.2024."])
+        self.assertEqual(Arrangement.objects.count(), 10)
+
+        response = self.client.post("/arrangement/import-day/", {
+            "source_date": "2024-02-01", "target_date": "2024-03-02"})
+        self.assertIn("Нет данных за 01.02.2024 для импорта.", [str(m) for m in get_messages(response.wsgi_request)])
+        self.assertEqual(Arrangement.objects.count(), 10)
+
+
+class ArrangementListViewTests(TestCase):
+    def setUp(self):
+        self.office, self.position, self.profiles = make_staff(6)
+        generate_arrangement_days(date(2024, 3, 1))
+
+    def test_day_page_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/arrangement/", {"date": "2024-03-01"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["apparatus"]), 3)
+        self.assertEqual(len(response.context["inspectors"]), 3)
+        self.assertFalse(response.context["is_empty"])
+
+    def test_query_budget_does_not_grow_with_staff(self):
+        Arrangement.objects.filter(profile=self.profiles[0]).update(response_audit=self.profiles[1])
+        for i in range(20):
+            Profile.objects.create(last_name=f"Жаңы{i}", first_name="Кызматкер", office=self.office,
+                                   position=self.position, is_inspector=True)
+        generate_arrangement_days(date(2024, 3, 1))
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/arrangement/", {"date": "2024-03-01"})
+        self.assertEqual(len(response.context["inspectors"]), 23)
+
+    def test_empty_day(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/arrangement/", {"date": "2024-04-01"})
+        self.assertTrue(response.context["is_empty"])
+
+
+@override_settings(REQUEST_PROFILING=True, SLOW_REQUEST_MS=10_000, SLOW_REQUEST_QUERIES=3)
+class RequestProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        make_staff()
+        generate_arrangement_days(date(2024, 3, 1))
+
+    def test_server_timing_header(self):
+        response = self.client.get("/arrangement/", {"date": "2024-03-01"})
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="1 queries", render;dur=[\d.]+')
+
+    async def test_async_views_are_timed_without_thread_hop(self):
+        response = await self.async_client.get("/employee_list/")
+        # Запросы из sync_to_async внутри асинхронного представления тоже посчитаны
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn("employees", RequestProfilingMiddleware.snapshot())
+
+    def test_slow_request_is_logged(self):
+        with self.assertLogs("core.slow_requests", level="WARNING") as logs:
+            self.client.get("/contacts/")
+        self.assertIn("[contacts]", logs.output[0])
+
+    def test_stats_are_shown_to_staff(self):
+        self.client.get("/arrangement/", {"date": "2024-03-01"})
+        self.assertEqual(self.client.get("/profiling/").status_code, 302)
+
+        self.client.force_login(User.objects.create_user("admin", password="pass", is_staff=True))
+        entry = self.client.get("/profiling/").json()["views"]["arrangement"]
+        self.assertGreaterEqual(entry["requests"], 1)
+        self.assertEqual(entry["avg_queries"], round(entry["queries"] / entry["requests"], 1))
+
+
+class SyntheticDataTests(TestCase):
+    def test_generate_synthetic_data(self):
+        call_command("generate_synthetic_data", profiles=60, departments=5, positions=10, years=1,
+                     stdout=StringIO())
+
+        self.assertEqual(Profile.objects.count(), 60)
+        for profile in Profile.objects.all():
+            self.assertRegex(profile.pin, r"^[12]\d{13}$")
+            self.assertEqual(profile.pin[1:9], profile.birth_date.strftime("%d%m%Y"))
+            self.assertEqual(profile.gender, "female" if profile.pin[0] == "1" else "male")
+        self.assertTrue(Arrangement.objects.filter(profile__office__name=CENTRAL_OFFICE_NAME).exists())
+
+        with self.assertRaises(CommandError):
+            call_command("generate_synthetic_data", profiles=1, stdout=StringIO())
+
+
+class KeysetPaginationTests(TestCase):
+    fields = ("last_name", "first_name", "id")
+
+    def setUp(self):
+        office, position, _ = make_staff()
+        # Однофамильцы и полные тёзки: порядок решает id
+        for first_name in ["Бакыт", "Айбек", "Айбек"]:
+            Profile.objects.create(last_name="Асанов", first_name=first_name, office=office, position=position)
+
+    def test_cursor_round_trip(self):
+        values = ["Өмүрбеков", "Айгүл", 42]
+        self.assertEqual(decode_cursor(encode_cursor(values), 3), values)
+        for broken in ["", "не-base64!", encode_cursor(values)[:-2], encode_cursor({"a": 1}), encode_cursor([1])]:
+            self.assertIsNone(decode_cursor(broken, 3), broken)
+
+    def test_pages_cover_every_row_once(self):
+        expected = list(Profile.objects.order_by(*self.fields).values_list("id", flat=True))
+        seen, cursor = [], None
+        while True:
+            page = keyset_paginate(Profile.objects.all(), self.fields, cursor, page_size=2)
+            seen += [profile.id for profile in page.object_list]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+
+    def test_api_follows_cursor_and_search(self):
+        first = self.client.get("/employee_list/api/").json()
+        self.assertEqual(len(first["results"]), 9)
+        self.assertIsNone(first["next_cursor"])
+
+        with patch.object(ProfileOfficesListView, "page_size", 4):
+            page = self.client.get("/employee_list/api/").json()
+            names = [row["full_name"] for row in page["results"]]
+            while page["next_cursor"]:
+                page = self.client.get("/employee_list/api/", {"cursor": page["next_cursor"]}).json()
+                names += [row["full_name"] for row in page["results"]]
+        self.assertEqual(names, [row["full_name"] for row in first["results"]])
+        self.assertEqual(names[:3], ["Асанов Айбек", "Асанов Айбек", "Асанов Бакыт"])
+
+        found = self.client.get("/employee_list/api/", {"q": "асанов"}).json()["results"]
+        self.assertEqual(len(found), 3)
+        self.assertEqual(self.client.get("/employee_list/api/", {"q": "жок"}).json()["results"], [])
+        # Битый курсор — первая страница, а не ошибка
+        self.assertEqual(self.client.get("/employee_list/api/", {"cursor": "xyz"}).json(), first)
+
+
+class AsyncReadViewsTests(TestCase):
+    def setUp(self):
+        make_staff()
+        generate_arrangement_days(date(2024, 3, 1))
+
+    async def test_read_views_under_asgi(self):
+        for url in ["/contacts/", "/employee_list/", "/arrangement/?date=2024-03-01"]:
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+        self.assertContains(response, "Фамилия0")
+
+        data = (await self.async_client.get("/employee_list/api/", {"office": ""})).json()
+        self.assertEqual(len(data["results"]), 6)
+
+        # Поиск (FTS) из асинхронного представления
+        response = await self.async_client.get("/employee_list/", {"q": "Фамилия1"})
+        self.assertContains(response, "Фамилия1")
+        self.assertNotContains(response, "Фамилия2")
+        data = (await self.async_client.get("/employee_list/api/", {"q": "Фамилия1"})).json()
+        self.assertEqual([row["full_name"] for row in data["results"]], ["Фамилия1 Имя1"])
+
+        response = await self.async_client.get("/contacts/export/")
+        self.assertEqual(b"".join([chunk async for chunk in response.streaming_content])[:2], b"PK")
+
+
+class ArrangementBulkUpdateTests(TestCase):
+    def setUp(self):
+        make_staff()
+        generate_arrangement_days(date(2024, 3, 1))
+        self.ids = list(Arrangement.objects.order_by("id").values_list("id", flat=True))
+
+    def post(self, edits):
+        return self.client.post("/arrangement/bulk-update/", json.dumps({"edits": edits}),
+                                content_type="application/json").json()
+
+    def test_counts_written_rows_and_reports_bad_edits(self):
+        edits = [{"id": pk, "field": "audit_address", "value": "Бишкек"} for pk in self.ids[:3]]
+        edits += [
+            {"id": self.ids[0], "field": "on_status", "value": "Ооруп"},
+            # Повтор ячейки: остаётся последнее значение, строка пишется один раз
+            {"id": self.ids[0], "field": "audit_address", "value": "Ош"},
+            {"id": self.ids[1], "field": "profile", "value": "1"},
+            {"id": 999999, "field": "on_status", "value": "-"},
+            {"id": "abc", "field": "on_status", "value": "-"},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            data = self.post(edits)
+        # Один UPDATE на поле, а не на ячейку
+        self.assertEqual(len([q for q in queries if q["sql"].startswith('UPDATE "accounts_arrangement"')]), 2)
+
+        self.assertFalse(data["success"])
+        self.assertEqual(data["updated"], 4)
+        self.assertEqual(sorted(error["error"] for error in data["errors"]),
+                         ["Invalid field", "Invalid id", "Object not found"])
+        self.assertEqual(Arrangement.objects.filter(audit_address="Бишкек").count(), 2)
+        first = Arrangement.objects.get(pk=self.ids[0])
+        self.assertEqual((first.audit_address, first.on_status), ("Ош", "Ооруп"))
+        self.assertEqual(ArrangementDaySummary.objects.get(date=date(2024, 3, 1)).on_leave, 1)
+
+    def test_single_cell_update_accepts_only_editable_fields(self):
+        url = f"/arrangement/update/{self.ids[0]}/"
+        for field, value in [("date_create", "2024-03-05"), ("profile", 1), ("response_audit_id", 2), ("pk", 7)]:
+            data = self.client.post(url, json.dumps({"field": field, "value": value}),
+                                    content_type="application/json").json()
+            self.assertEqual(data, {"success": False, "error": "Invalid field"}, field)
+        self.assertEqual(Arrangement.objects.get(pk=self.ids[0]).date_create, date(2024, 3, 1))
+
+        data = self.client.post(url, json.dumps({"field": "on_status", "value": "Ооруп"}),
+                                content_type="application/json").json()
+        self.assertTrue(data["success"])
+        self.assertEqual(ArrangementDaySummary.objects.get(date=date(2024, 3, 1)).on_leave, 1)
+
+    def test_rejects_malformed_payload(self):
+        response = self.client.post("/arrangement/bulk-update/", "{", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post([])["updated"], 0)
+
+
+class ArrangementLiveFeedTests(TestCase):
+    def setUp(self):
+        make_staff()
+        generate_arrangement_days(date(2024, 3, 1))
+        self.arrangement = Arrangement.objects.first()
+
+    def test_bulk_update_publishes_changed_cells(self):
+        cursor = arrangement_feed.cursor(date(2024, 3, 1))
+        edits = [{"id": self.arrangement.id, "field": "on_status", "value": "Командировка"}]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/arrangement/bulk-update/", json.dumps({"edits": edits}),
+                             content_type="application/json")
+
+        changes, new_cursor = arrangement_feed.since(date(2024, 3, 1), cursor)
+        self.assertEqual(changes, edits)
+        self.assertEqual(arrangement_feed.since(date(2024, 3, 1), new_cursor)[0], [])
+        # Курсор другого процесса: без перезагрузки, продолжаем с текущей позиции
+        self.assertEqual(arrangement_feed.since(date(2024, 3, 1), "other-process:7"), ([], new_cursor))
+
+    async def test_events_stream_pushes_cells(self):
+        day = date(2024, 3, 1)
+        cursor = arrangement_feed.cursor(day)
+        arrangement_feed.publish(day, [{"id": self.arrangement.id, "field": "time_check", "value": "10:00"}])
+
+        response = await self.async_client.get("/arrangement/events/", {"date": "2024-03-01", "after": cursor})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        await anext(stream)  # retry
+        event = (await anext(stream)).decode()
+        self.assertIn("event: cells", event)
+        self.assertIn('"value": "10:00"', event)
+        await stream.aclose()
+
+    def test_wsgi_answers_without_waiting(self):
+        start = time.monotonic()
+        response = self.client.get("/arrangement/events/", {"date": "2024-03-01", "after": "other-process:3"})
+        body = response.content.decode()
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertIn("retry: 5000", body)
+        self.assertIn(f"id: {arrangement_feed.cursor(date(2024, 3, 1))}", body)
+        self.assertNotIn("reload", body)
+
+
+class DirectorySnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.office, self.position, self.profiles = make_staff()
+
+    def names(self, departments):
+        return [employee["profile"]["last_name"] for dept in departments for employee in dept["employees"]]
+
+    def test_snapshot_is_cached_per_office_and_query(self):
+        everyone = get_departments_list()
+        self.assertEqual(len(self.names(everyone)), 6)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_departments_list(), everyone)
+
+        central = get_departments_list(self.office.pk)
+        self.assertNotIn("Ошский", self.names(central))
+        self.assertEqual(self.names(get_departments_list(query="фамилия3")), ["Фамилия3"])
+        self.assertEqual(get_departments_list(query="жок"), [])
+        with self.assertNumQueries(0):
+            get_departments_list(self.office.pk)
+            get_departments_list(query="фамилия3")
+            get_departments_list(query="жок")
+
+    def test_changes_invalidate_snapshot(self):
+        get_departments_list()
+
+        self.profiles[0].last_name = "Жаңы"
+        self.profiles[0].save()
+        self.assertIn("Жаңы", self.names(get_departments_list()))
+
+        self.position.title = "Башкы аудитор"
+        self.position.save()
+        titles = {e["position"]["title"] for dept in get_departments_list() for e in dept["employees"]}
+        self.assertEqual(titles, {"Башкы аудитор"})
+
+        self.position.department.name = "Текшерүү бөлүмү"
+        self.position.department.save()
+        self.assertEqual(get_departments_list()[0]["dept"]["name"], "Текшерүү бөлүмү")
+
+        self.profiles[1].delete()
+        self.assertNotIn("Фамилия1", self.names(get_departments_list()))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        _, _, self.profiles = make_staff()
+
+    def test_directory_pages_answer_304_until_data_changes(self):
+        self.client.get("/contacts/")  # выдаёт cookie CSRF, она входит в ETag
+        for url in ["/contacts/", "/employee_list/", "/contacts/export/"]:
+            response = self.client.get(url)
+            self.assertTrue(response.has_header("Last-Modified"), url)
+
+            with self.assertNumQueries(0):
+                cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(cached.status_code, 304, url)
+
+        etag = self.client.get("/contacts/")["ETag"]
+        self.profiles[0].office_number = "305"
+        self.profiles[0].save()
+        self.assertEqual(self.client.get("/contacts/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_employee_detail_uses_updated_at(self):
+        url = f"/employees/{self.profiles[0].pk}/"
+        response = self.client.get(url)
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(cached.status_code, 304)
+
+
+
+class TemplateFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _, _, self.profiles = make_staff()
+
+    def test_department_blocks_follow_directory_version_and_language(self):
+        self.assertContains(self.client.get("/contacts/"), "Фамилия0")
+        # В обход сигналов: версия справочника не меняется — блоки отделов берутся из кэша
+        Profile.objects.filter(pk=self.profiles[0].pk).update(last_name="Новая")
+        self.assertContains(self.client.get("/contacts/"), "Фамилия0")
+
+        bump_directory_version()
+        self.assertContains(self.client.get("/contacts/"), "Новая")
+
+        version = get_directory_version()
+        # Блоки отделов в кэше — снимок справочника не читается
+        with patch("core.views.get_departments_list") as loader:
+            self.assertContains(self.client.get("/contacts/"), "Новая")
+        loader.assert_not_called()
+
+        self.client.cookies[settings.LANGUAGE_COOKIE_NAME] = "ru"
+        self.client.get("/contacts/")
+        for language in ("ky", "ru"):
+            key = make_template_fragment_key("contacts_departments", [version, "", "", language])
+            self.assertIsNotNone(cache.get(key), language)
+
+
+class StaticFilesMiddlewareTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, "css"))
+        for name in ["style.css", "style.0123456789ab.css"]:
+            with open(os.path.join(self.root, "css", name), "w") as f:
+                f.write("body { margin: 0; }\n" * 100)
+        compress_file(os.path.join(self.root, "css", "style.0123456789ab.css"))
+        with open(os.path.join(self.root, "staticfiles.json"), "w") as f:
+            json.dump({"paths": {"css/style.css": "css/style.0123456789ab.css"}}, f)
+
+    def test_serves_precompressed_hashed_files_as_immutable(self):
+        with self.settings(SERVE_STATIC=True, STATIC_ROOT=self.root):
+            response = self.client.get("/static/css/style.0123456789ab.css", HTTP_ACCEPT_ENCODING="gzip, deflate")
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertEqual(response["Content-Type"], "text/css")
+            self.assertIn("immutable", response["Cache-Control"])
+            body = gzip.decompress(b"".join(response.streaming_content))
+            self.assertTrue(body.startswith(b"body"))
+
+            plain = self.client.get("/static/css/style.css")
+            self.assertFalse(plain.has_header("Content-Encoding"))
+            self.assertEqual(plain["Cache-Control"], "public, max-age=60")
+
+            cached = self.client.get("/static/css/style.css", HTTP_IF_NONE_MATCH=plain["ETag"])
+            self.assertEqual(cached.status_code, 304)
+
+    async def test_streams_under_asgi(self):
+        with self.settings(SERVE_STATIC=True, STATIC_ROOT=self.root):
+            response = await self.async_client.get("/static/css/style.0123456789ab.css",
+                                                   headers={"Accept-Encoding": "gzip"})
+            self.assertTrue(response.is_async)
+            body = b"".join([chunk async for chunk in response.streaming_content])
+            self.assertEqual(len(body), int(response["Content-Length"]))
+            self.assertTrue(gzip.decompress(body).startswith(b"body"))
+            self.assertIn("immutable", response["Cache-Control"])
+
+    def test_respects_accept_encoding_q_values(self):
+        with self.settings(SERVE_STATIC=True, STATIC_ROOT=self.root):
+            for header, expected in [("gzip;q=0, deflate", None), ("GZIP; q=0.5", "gzip"),
+                                     ("x-gzip-foo", None), ("*;q=0.1, br;q=0", "gzip"), ("*, gzip;q=0, br;q=0", None)]:
+                response = self.client.get("/static/css/style.0123456789ab.css", HTTP_ACCEPT_ENCODING=header)
+                self.assertEqual(response.get("Content-Encoding"), expected, header)
+                response.close()
+
+
+class ArrangementSummaryTests(TestCase):
+    def setUp(self):
+        make_staff()
+        generate_arrangement_days(date(2024, 3, 1), date(2024, 3, 2))
+
+    def bulk_edit(self, *edits):
+        self.client.post("/arrangement/bulk-update/", json.dumps({"edits": list(edits)}),
+                         content_type="application/json")
+
+    def test_summaries_follow_day_operations(self):
+        summary = ArrangementDaySummary.objects.get(date=date(2024, 3, 1))
+        self.assertEqual((summary.total, summary.inspectors, summary.on_leave), (5, 3, 0))
+
+        first, second = Arrangement.objects.filter(date_create=date(2024, 3, 1))[:2]
+        self.bulk_edit({"id": first.id, "field": "on_status", "value": "Эмгек өргүүдө"},
+                       {"id": second.id, "field": "on_status", "value": "   "},
+                       {"id": second.id, "field": "time_check", "value": "Келген жок"})
+        summary.refresh_from_db()
+        self.assertEqual((summary.on_leave, summary.absent_at_check), (1, 1))
+
+        self.client.post("/arrangement/import-day/", {"source_date": "2024-03-01", "target_date": "2024-03-02"})
+        self.assertEqual(ArrangementDaySummary.objects.get(date=date(2024, 3, 2)).on_leave, 1)
+
+        self.client.post("/arrangement/clear-day/", {"date": "2024-03-01"})
+        summary.refresh_from_db()
+        self.assertEqual((summary.total, summary.on_leave, summary.absent_at_check), (5, 0, 0))
+
+    def test_report_reads_only_rollups(self):
+        ArrangementDaySummary.objects.all().delete()
+        call_command("rebuild_arrangement_summaries", stdout=StringIO())
+
+        with self.assertNumQueries(1):
+            data = self.client.get("/arrangement/report/api/", {"date_from": "2024-02-01", "date_to": "2024-03-31"}).json()
+        self.assertEqual([day["date"] for day in data["days"]], ["2024-03-01", "2024-03-02"])
+        self.assertEqual(data["totals"]["total"], 10)
+
+        response = self.client.get("/arrangement/report/", {"date_from": "2024-03-01", "date_to": "2024-03-02"})
+        self.assertContains(response, "01.03.2024")
+
+
+
+class ContactsExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.office, self.position, self.profiles = make_staff()
+
+    def export(self):
+        response = self.client.get("/contacts/export/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("attachment", response["Content-Disposition"])
+        return openpyxl.load_workbook(BytesIO(b"".join(response.streaming_content)), read_only=True)
+
+    def test_sheet_per_office_grouped_by_department(self):
+        workbook = self.export()
+        self.assertEqual(workbook.sheetnames, [CENTRAL_OFFICE_NAME, "Ош"])
+
+        rows = [row for row in workbook[CENTRAL_OFFICE_NAME].values if any(row)]
+        self.assertIn(CENTRAL_OFFICE_NAME, rows[0][0])
+        self.assertIn("Исанов көч., 131", rows[2][0])
+        self.assertEqual(list(rows[3]), CONTACTS_HEADERS)
+        self.assertEqual(rows[4][0], "Отдел аудита")
+        self.assertEqual([row[0] for row in rows[5:]], [1, 2, 3, 4, 5])
+        self.assertTrue(rows[5][1].startswith("Фамилия0 Имя0"))
+        self.assertEqual(rows[5][2], "Аудитор")
+
+        rows = [row for row in workbook["Ош"].values if any(row)]
+        self.assertEqual(len(rows), 5)  # без строки с адресом центрального аппарата
+        self.assertTrue(rows[4][1].startswith("Ошский"))
+
+    def test_export_follows_profile_changes(self):
+        self.export()
+        self.profiles[0].phone_number_work = "62-54-62"
+        self.profiles[0].save()
+        rows = list(self.export()[CENTRAL_OFFICE_NAME].values)
+        self.assertIn("62-54-62", [row[3] for row in rows if row and row[0] == 1])
+
+    def test_writer_reads_staff_in_one_query(self):
+        Profile.objects.bulk_create([Profile(last_name=f"Кошумча{i}", first_name="Аты", office=self.office,
+                                             position=self.position) for i in range(300)])
+        stream = BytesIO()
+        with self.assertNumQueries(1):
+            write_contacts_workbook(stream)
+        rows = list(openpyxl.load_workbook(stream, read_only=True)[CENTRAL_OFFICE_NAME].values)
+        self.assertEqual(max(row[0] for row in rows if row and isinstance(row[0], int)), 305)
+
+
+class ArrangementExportTests(TestCase):
+    def setUp(self):
+        make_staff()
+        generate_arrangement_days(date(2024, 3, 1), date(2024, 3, 2))
+        Arrangement.objects.filter(date_create=date(2024, 3, 2), profile__last_name="Фамилия1").update(
+            on_status="Эмгек өргүүдө")
+        self.results_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.results_dir)
+
+    async def test_csv_streams_under_wsgi_and_asgi(self):
+        params = {"date_from": "2024-03-01", "date_to": "2024-03-02", "format": "csv"}
+        wsgi_body = await sync_to_async(
+            lambda: b"".join(self.client.get("/arrangement/export/", params).streaming_content))()
+        response = await self.async_client.get("/arrangement/export/", params)
+        self.assertEqual(b"".join([chunk async for chunk in response.streaming_content]), wsgi_body)
+
+        lines = wsgi_body.decode("utf-8-sig").splitlines()
+        self.assertEqual(len(lines), 11)  # заголовок + 5 сотрудников × 2 дня, без филиалов
+        self.assertTrue(lines[1].startswith("2024-03-01;Фамилия0 Имя0"))
+        self.assertIn("2024-03-02;Фамилия1 Имя1;Аудитор;;;;;;Эмгек өргүүдө", wsgi_body.decode("utf-8-sig"))
+
+    def test_range_workbook_is_built_by_job_with_sheet_per_day(self):
+        with self.settings(JOB_RESULTS_DIR=self.results_dir):
+            worker_heartbeat()
+            response = self.client.get("/arrangement/export/", {"date_from": "2024-03-01", "date_to": "2024-03-02"})
+            self.assertEqual(response.status_code, 202)
+            call_command("run_jobs", "--once", stdout=StringIO())
+
+            job = Job.objects.get()
+            self.assertEqual(job.status, Job.DONE)
+            workbook = openpyxl.load_workbook(job.result_file, read_only=True)
+            self.assertEqual(workbook.sheetnames, ["01.03.2024", "02.03.2024"])
+            self.assertEqual(len(list(workbook["02.03.2024"].values)), 6)
+
+        # Один день собирается сразу, одной таблицей с колонкой даты
+        response = self.client.get("/arrangement/export/", {"date_from": "2024-03-01", "date_to": "2024-03-01",
+                                                             "layout": "table"})
+        workbook = openpyxl.load_workbook(BytesIO(b"".join(response.streaming_content)), read_only=True)
+        rows = list(workbook.active.values)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][0].date(), date(2024, 3, 1))
+
+    def test_too_long_range_is_rejected(self):
+        response = self.client.get("/arrangement/export/", {"date_from": "2020-01-01", "date_to": "2024-01-01"})
+        self.assertEqual(response.status_code, 400)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        make_staff()
+        self.results_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.results_dir)
+        settings_override = override_settings(JOB_RESULTS_DIR=self.results_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_range_generation_is_queued_and_run_by_worker(self):
+        worker_heartbeat()
+        response = self.client.post("/arrangement/generate-day/", {"date": "2024-03-01", "date_to": "2024-03-03"})
+        job = Job.objects.get()
+        self.assertIn(f"job={job.pk}", response["Location"])
+        self.assertFalse(Arrangement.objects.exists())
+
+        call_command("run_jobs", "--once", stdout=StringIO())
+
+        self.assertEqual(Arrangement.objects.count(), 15)
+        status = self.client.get(f"/jobs/{job.pk}/").json()
+        self.assertEqual((status["status"], status["result"]), ("done", {"created": 15}))
+
+    def test_job_runs_inline_without_worker(self):
+        cursor = arrangement_feed.cursor(date(2024, 3, 2))
+        with self.assertLogs("core.jobs", "WARNING"), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/arrangement/generate-day/",
+                                        {"date": "2024-03-01", "date_to": "2024-03-03"})
+        # Открытые таблицы каждого дня получают перезагрузку
+        self.assertEqual(arrangement_feed.since(date(2024, 3, 2), cursor)[0], [{"reload": True}])
+        self.assertNotIn("job=", response["Location"])
+        self.assertEqual(Arrangement.objects.count(), 15)
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    def test_import_job_reloads_target_days(self):
+        generate_arrangement_days(date(2024, 3, 1))
+        cursors = {day: arrangement_feed.cursor(day) for day in [date(2024, 3, 1), date(2024, 3, 2)]}
+        enqueue("import_arrangement", source_date="2024-03-01", target_date="2024-03-01",
+                target_date_to="2024-03-02")
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("run_jobs", "--once", stdout=StringIO())
+
+        self.assertEqual(arrangement_feed.since(date(2024, 3, 2), cursors[date(2024, 3, 2)])[0], [{"reload": True}])
+        self.assertEqual(arrangement_feed.since(date(2024, 3, 1), cursors[date(2024, 3, 1)])[0], [])
+
+    def test_export_job_result_is_downloadable(self):
+        worker_heartbeat()
+        response = self.client.get("/contacts/export/", {"background": 1})
+        self.assertEqual(response.status_code, 202)
+        call_command("run_jobs", "--once", stdout=StringIO())
+
+        status = self.client.get(response.json()["status_url"]).json()
+        download = self.client.get(status["download_url"])
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(b"".join(download.streaming_content)[:2], b"PK")
+
+    async def test_downloads_are_not_buffered_under_asgi(self):
+        await sync_to_async(worker_heartbeat)()
+        job = await sync_to_async(enqueue)("contacts_export")
+        await sync_to_async(call_command)("run_jobs", "--once", stdout=StringIO())
+        await self.async_client.aforce_login(await User.objects.acreate(username="admin", is_staff=True))
+
+        for url in ["/contacts/export/", f"/jobs/{job.pk}/download/"]:
+            response = await self.async_client.get(url)
+            # Синхронный итератор Django под ASGI прочитал бы файл целиком перед отправкой
+            self.assertTrue(response.is_async, url)
+            self.assertIn("attachment", response["Content-Disposition"])
+            body = b"".join([chunk async for chunk in response.streaming_content])
+            self.assertEqual(len(body), int(response["Content-Length"]), url)
+            self.assertEqual(body[:2], b"PK", url)
+
+    def test_anonymous_jobs_are_visible_only_to_their_session(self):
+        worker_heartbeat()
+        status_url = self.client.get("/contacts/export/", {"background": 1}).json()["status_url"]
+        self.assertEqual(self.client.get(status_url).status_code, 200)
+        self.assertEqual(Client().get(status_url).status_code, 404)
+
+    def test_failed_job_keeps_error(self):
+        job = enqueue("import_arrangement", source_date="not-a-date", target_date="2024-03-01")
+
+        with self.assertLogs("core.jobs", "ERROR"):
+            call_command("run_jobs", "--once", stdout=StringIO(), stderr=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("ValueError", job.error)
+
+
+class SQLiteConcurrencyTests(TransactionTestCase):
+    """Параллельные правки сетки не должны падать с «database is locked»"""
+
+    workers = 8
+    edits_per_worker = 25
+
+    def setUp(self):
+        make_staff(self.workers)
+        generate_arrangement_days(date(2024, 3, 1))
+        self.ids = list(Arrangement.objects.order_by("id").values_list("id", flat=True))
+
+    def test_connection_pragmas(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Только для SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0].lower(), "wal")
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_parallel_arrangement_updates(self):
+        def worker(n):
+            from django.test import Client
+
+            client = Client()
+            results = []
+            try:
+                for i in range(self.edits_per_worker):
+                    response = client.post(
+                        f"/arrangement/update/{self.ids[n]}/",
+                        json.dumps({"field": "time_check", "value": f"{n}:{i}"}),
+                        content_type="application/json",
+                    )
+                    results.append(response.json()["success"])
+            finally:
+                connections.close_all()
+            return results
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = [ok for chunk in pool.map(worker, range(self.workers)) for ok in chunk]
+
+        self.assertEqual(len(results), self.workers * self.edits_per_worker)
+        self.assertTrue(all(results))
+        last = f"{self.edits_per_worker - 1}"
+        for n, pk in enumerate(self.ids[:self.workers]):
+            self.assertEqual(Arrangement.objects.get(pk=pk).time_check, f"{n}:{last}")
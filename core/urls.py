@@ -11,11 +11,20 @@ urlpatterns = [
     path("contacts/", EmployeePhonesListView.as_view(), name="contacts"),
     path("contacts/export/", views.export_contacts_excel, name="contacts_export_excel"),
     path("employee_list/", ProfileOfficesListView.as_view(), name="employees"),
+    path("employee_list/api/", views.employees_api, name="employees_api"),
     path("settings/", views.settings, name="settings"),
     path("arrangement/", ArrangementListView.as_view(), name="arrangement"),
     path("arrangement/update/<int:pk>/", views.arrangement_update, name="arrangement_update"),
+    path("arrangement/bulk-update/", views.arrangement_bulk_update, name="arrangement_bulk_update"),
+    path("arrangement/events/", views.arrangement_events, name="arrangement_events"),
     path("employees/<int:pk>/", EmployeeDetailView.as_view(), name="employee_detail"),
     path("arrangement/import-day/", views.import_arrangement_day, name="import_arrangement_day"),
     path("arrangement/generate-day/", views.generate_arrangement_day, name="generate_arrangement_day"),
     path("arrangement/clear-day/", views.clear_arrangement_day, name="clear_arrangement_day"),
+    path("arrangement/report/", views.arrangement_report, name="arrangement_report"),
+    path("arrangement/report/api/", views.arrangement_report_api, name="arrangement_report_api"),
+    path("arrangement/export/", views.export_arrangement, name="arrangement_export"),
+    path("jobs/<int:pk>/", views.job_status, name="job_status"),
+    path("jobs/<int:pk>/download/", views.job_download, name="job_download"),
+    path("profiling/", views.profiling_stats, name="profiling_stats"),
 ]
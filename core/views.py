@@ -1,22 +1,38 @@
+import io
 import json
-import openpyxl
+import mimetypes
+import os
+import time
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Prefetch
-from django.http import JsonResponse, HttpResponse
+from django.db import transaction
+from django.http import JsonResponse, FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.shortcuts import render, redirect
+from django.utils.functional import SimpleLazyObject
+from django.shortcuts import render, redirect, get_object_or_404
+from django.template.response import TemplateResponse
 from django.http import HttpResponseRedirect
 from django.urls import reverse
-from django.views.generic import ListView, DetailView
+from django.utils.http import content_disposition_header
+from django.views.generic import View, DetailView
 from datetime import datetime, timedelta, date
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
-from urllib.parse import quote
 
 from accounts.models import Profile, Arrangement
-from core.models import Department, Office, Position
+from accounts.search import search_profiles
+from core.arrangements import (date_range, generate_arrangement_days, copy_arrangement_day,
+                               refresh_day_summaries, summary_report, SUMMARY_FIELDS)
+from core.conditional import ConditionalGetMixin, request_etag, not_modified, add_validators
+from core.directory import (get_departments_list, aget_offices, aget_directory_version, get_directory_version,
+                            adirectory_last_modified, cached_export_path)
+from core.exports import write_contacts_workbook, write_arrangement_workbook, iter_arrangement_csv, aiter_arrangement_csv
+from core.jobs import submit
+from core.live import arrangement_feed, publish_cells, publish_reload, sse_event
+from core.middleware import RequestProfilingMiddleware, aiter_file
+from core.models import Job, CENTRAL_OFFICE_NAME
+from core.pagination import akeyset_paginate
 
 
 @login_required
@@ -49,100 +65,115 @@ def arrangement(request):
     return render(request, "core/arrangement.html")
 
 
-class EmployeePhonesListView(ListView):
-    model = Department
+class EmployeePhonesListView(View):
+    """Справочник телефонов. Асинхронное: под ASGI ожидание кэша и БД не занимает поток"""
     template_name = "core/contacts.html"
-    context_object_name = "departments_data"
 
-    def get_queryset(self):
-        office_id = self.request.GET.get("office")
-        profiles_qs = Profile.objects.select_related("position", "office")
-        query = self.request.GET.get("q")
-
-        if query:
-            profiles_qs = profiles_qs.filter(
-                Q(last_name__icontains=query) |
-                Q(first_name__icontains=query) |
-                Q(patronymic__icontains=query) |
-                Q(phone_number_work__icontains=query) |
-                Q(phone_number_government__icontains=query) |
-                Q(phone_number_mobile__icontains=query)
-            )
-
-        if office_id:
-            profiles_qs = profiles_qs.filter(office_id=office_id)
-
-        positions_qs = Position.objects.prefetch_related(
-            Prefetch("profiles", queryset=profiles_qs, to_attr="prefetched_profiles")
-        )
-
-        departments_qs = Department.objects.prefetch_related(
-            Prefetch("positions", queryset=positions_qs, to_attr="prefetched_positions")
-        ).order_by("name")
-
-        return departments_qs
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        office_id = self.request.GET.get("office")
-
-        departments_list = []
-
-        for dept in context["departments_data"]:
-            employees = []
-            for pos in getattr(dept, "prefetched_positions", []):
-                for prof in getattr(pos, "prefetched_profiles", []):
-                    employees.append({"profile": prof, "position": pos})
-
-            if employees:
-                departments_list.append({"dept": dept, "employees": employees})
+    async def get(self, request):
+        office_id = request.GET.get("office")
+        # Валидаторы из версии справочника и кэша — повторный заход отвечает 304 без запросов к БД
+        version = await aget_directory_version()
+        etag = request_etag(request, "contacts", version, office_id, request.GET.get("q"))
+        last_modified = await adirectory_last_modified(office_id)
+        if response := not_modified(request, etag, last_modified):
+            return response
+
+        # Снимок справочника (см. core.directory) читается только при промахе кэша блоков отделов
+        # в шаблоне — обычно шаблон берёт готовый HTML и снимок не нужен вовсе.
+        # Шаблон рендерится в потоке, поэтому синхронная загрузка не блокирует цикл событий.
+        query = request.GET.get("q")
+        departments_list = SimpleLazyObject(lambda: get_departments_list(office_id, query))
+
+        # TemplateResponse рендерится обработчиком Django в потоке, а не в цикле событий
+        response = TemplateResponse(request, self.template_name, {
+            "departments_data": departments_list,
+            "departments_list": departments_list,
+            "offices": await aget_offices(),
+            "selected_office": office_id or "",
+            "query": request.GET.get("q", ""),
+            "directory_version": version,  # ключ кэша блоков отделов в шаблоне
+        })
+        return add_validators(response, etag, last_modified)
+
+
+EMPLOYEE_LIST_ORDERING = ("last_name", "first_name", "id")
+
+
+def employee_list_queryset(office_id=None, query=None):
+    """Профили для списка сотрудников — только нужные шаблону поля, без N+1 по должности"""
+    queryset = Profile.objects.select_related("position").only(
+        "last_name", "first_name", "patronymic", "email", "status", "office_id", "position__title",
+    )
 
-        context["departments_list"] = departments_list
-        context["offices"] = Office.objects.all()
-        context["selected_office"] = office_id or ""
-        context["query"] = self.request.GET.get("q", "")
-        return context
+    # фильтрация по филиалу
+    if office_id:
+        queryset = queryset.filter(office_id=office_id)
+    if query:
+        queryset = search_profiles(queryset, query)
+    return queryset
 
 
-class ProfileOfficesListView(ListView):
-    model = Profile
+class ProfileOfficesListView(View):
     template_name = "core/empl_list.html"
-    context_object_name = "employees"
-
-    def get_queryset(self):
-        queryset = super().get_queryset().select_related("office")
-
-        # фильтрация по филиалу
-        office_id = self.request.GET.get("office")
-        if office_id:
-            queryset = queryset.filter(office_id=office_id)
-        query = self.request.GET.get("q")
-        if query:
-            queryset = queryset.filter(
-                Q(last_name__icontains=query) |
-                Q(first_name__icontains=query) |
-                Q(email__icontains=query)
-            )
-        return queryset
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context["offices"] = Office.objects.all()
-        context["selected_office"] = self.request.GET.get("office")
-        return context
-
-
-class EmployeeDetailView(DetailView):
+    page_size = 50
+
+    async def get(self, request):
+        office_id = request.GET.get("office")
+        etag = request_etag(request, "employees", await aget_directory_version(), office_id,
+                            request.GET.get("q"), request.GET.get("cursor"))
+        last_modified = await adirectory_last_modified(office_id)
+        if response := not_modified(request, etag, last_modified):
+            return response
+
+        # Поиск проверяет наличие FTS-таблицы синхронным курсором — собираем queryset в потоке
+        queryset = await sync_to_async(employee_list_queryset)(office_id, request.GET.get("q"))
+        page = await akeyset_paginate(queryset, EMPLOYEE_LIST_ORDERING, request.GET.get("cursor"), self.page_size)
+        response = TemplateResponse(request, self.template_name, {
+            "employees": page.object_list,
+            "object_list": page.object_list,
+            "next_cursor": page.next_cursor,
+            "offices": await aget_offices(),
+            "selected_office": office_id,
+        })
+        return add_validators(response, etag, last_modified)
+
+
+async def employees_api(request):
+    """Следующая страница списка сотрудников в JSON (для подгрузки на странице)"""
+    page_size = ProfileOfficesListView.page_size
+    queryset = await sync_to_async(employee_list_queryset)(request.GET.get("office"), request.GET.get("q"))
+    page = await akeyset_paginate(queryset, EMPLOYEE_LIST_ORDERING, request.GET.get("cursor"), page_size)
+    results = [
+        {
+            "id": p.id,
+            "full_name": f"{p.last_name} {p.first_name} {p.patronymic or ''}".strip(),
+            "position": p.position.title if p.position else "",
+            "email": p.email or "",
+            "status": p.status,
+            "status_display": p.get_status_display(),
+            "office_id": p.office_id,
+            "url": reverse("employee_detail", args=[p.id]),
+        }
+        for p in page.object_list
+    ]
+    return JsonResponse({"results": results, "next_cursor": page.next_cursor})
+
+
+class EmployeeDetailView(ConditionalGetMixin, DetailView):
     model = Profile
     template_name = "accounts/dashboard_empl.html"  # путь к шаблону
     context_object_name = "employee"
 
+    def get_validators(self):
+        updated_at = Profile.objects.filter(pk=self.kwargs["pk"]).values_list("updated_at", flat=True).first()
+        # Версия справочника — на случай переименования должности или филиала
+        return request_etag(self.request, "employee", self.kwargs["pk"], updated_at,
+                            get_directory_version()), updated_at
 
-class ArrangementListView(ListView):
-    model = Arrangement
+
+class ArrangementListView(View):
     template_name = "core/arrangement.html"
-    context_object_name = "arrangements"
-    OFFICE_NAME = "Борбордук аппарат"
+    OFFICE_NAME = CENTRAL_OFFICE_NAME
 
     def get_selected_date(self):
         date_str = self.request.GET.get("date")
@@ -160,49 +191,137 @@ class ArrangementListView(ListView):
                 date_create=selected_date,
                 profile__office__name=self.OFFICE_NAME
             )
-            .select_related("profile", "position")
+            .select_related("profile", "position", "response_audit")
             .order_by("profile__last_name", "profile__first_name")
         )
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    async def get(self, request):
         selected_date = self.get_selected_date()
-        qs = self.get_queryset()
-
-        context["selected_date"] = selected_date
-        context["previous_date"] = selected_date - timedelta(days=1)
-        context["next_date"] = selected_date + timedelta(days=1)
-
-        context["apparatus"] = qs.filter(profile__is_inspector=False)
-        context["inspectors"] = qs.filter(profile__is_inspector=True)
-        context["is_empty"] = not qs.exists()  # 👈 Проверяем, есть ли записи
-
-        return context
+        # Позицию ленты берём до чтения: правки, сделанные во время запроса, придут через SSE
+        feed_cursor = arrangement_feed.cursor(selected_date)
+        # Один запрос за день, дальше делим строки на аппарат и инспекторов в Python
+        rows = [arr async for arr in self.get_queryset()]
+
+        return TemplateResponse(request, self.template_name, {
+            "arrangements": rows,
+            "object_list": rows,
+            "selected_date": selected_date,
+            "previous_date": selected_date - timedelta(days=1),
+            "next_date": selected_date + timedelta(days=1),
+            "apparatus": [arr for arr in rows if not arr.profile.is_inspector],
+            "inspectors": [arr for arr in rows if arr.profile.is_inspector],
+            "is_empty": not rows,  # 👈 Проверяем, есть ли записи
+            "feed_cursor": feed_cursor,
+        })
+
+
+# Диапазоны длиннее этого числа дней обрабатываются фоновой задачей (см. core.jobs)
+ARRANGEMENT_INLINE_DAYS = 1
+# Номера задач анонимного пользователя — по ним он видит свои задачи
+SESSION_JOBS_KEY = "jobs"
+SESSION_JOBS_LIMIT = 20
+
+
+def submit_job(request, kind, **params):
+    job = submit(kind, request.user, **params)
+    if not request.user.is_authenticated:
+        request.session[SESSION_JOBS_KEY] = [*request.session.get(SESSION_JOBS_KEY, []), job.pk][-SESSION_JOBS_LIMIT:]
+    return job
+
+
+def _job_redirect(request, job, day, queued_message, done_message):
+    """Назад к расстановке: задача в очереди — страница дождётся её сама, выполнена сразу — сообщаем итог"""
+    if job.status == Job.DONE:
+        messages.success(request, done_message.format(**job.result))
+    elif job.status == Job.FAILED:
+        messages.error(request, job.error)
+    else:
+        messages.info(request, queued_message)
+        return redirect(f"{reverse('arrangement')}?date={day}&job={job.pk}")
+    return redirect(f"{reverse('arrangement')}?date={day}")
 
 
 def generate_arrangement_day(request):
-    """Создание записей для конкретного дня"""
+    """Создание записей для конкретного дня (или диапазона дней, если передан date_to)"""
     if request.method == "POST":
         date_str = request.POST.get("date")
+        date_to_str = request.POST.get("date_to")
         try:
             date_value = timezone.datetime.strptime(date_str, "%Y-%m-%d").date()
-        except ValueError:
+            date_to = timezone.datetime.strptime(date_to_str, "%Y-%m-%d").date() if date_to_str else None
+            days = date_range(date_value, date_to)
+        except (TypeError, ValueError):
             messages.error(request, "Неверная дата.")
             return redirect("arrangement")
 
+        if len(days) > ARRANGEMENT_INLINE_DAYS:
+            job = submit_job(request, "generate_arrangement", date=days[0].isoformat(), date_to=days[-1].isoformat())
+            return _job_redirect(request, job, date_value,
+                                 f"Формирование {len(days)} дней поставлено в очередь.",
+                                 "Сформировано {created} записей за %d дней." % len(days))
+
         # Отбираем только центральный аппарат
-        employees = Profile.objects.filter(office__name="Борбордук аппарат")
-        existing_ids = Arrangement.objects.filter(date_create=date_value).values_list("profile_id", flat=True)
-        new_records = [
-            Arrangement(profile=emp, position=emp.position, date_create=date_value)
-            for emp in employees if emp.id not in existing_ids
-        ]
-        Arrangement.objects.bulk_create(new_records)
-        messages.success(request, f"Сформировано {len(new_records)} записей на {date_value.strftime('%d.%m.%Y')}.")
+        created = generate_arrangement_days(days[0], days[-1])
+        publish_reload(date_value)
+        messages.success(request, f"Сформировано {created} записей на {date_value.strftime('%d.%m.%Y')}.")
 
         return redirect(f"{reverse('arrangement')}?date={date_value}")
 
 
+# Одно SSE-подключение живёт не дольше этого, затем браузер переподключается с Last-Event-ID
+ARRANGEMENT_EVENTS_TIMEOUT = 60
+ARRANGEMENT_EVENTS_HEARTBEAT = 15
+# Под WSGI вместо ожидания — опрос: ответ сразу, переподключение браузера через столько миллисекунд
+ARRANGEMENT_EVENTS_POLL_MS = 5000
+
+
+async def arrangement_events(request):
+    """SSE-лента правок расстановки за день: отдаёт только изменившиеся ячейки"""
+    try:
+        day = date.fromisoformat(request.GET.get("date", ""))
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Invalid date"}, status=400)
+    cursor = request.headers.get("Last-Event-ID") or request.GET.get("after") or arrangement_feed.cursor(day)
+
+    def needs_reload(changes):
+        return changes is None or any(change.get("reload") for change in changes)
+
+    def event(changes, previous, current):
+        if needs_reload(changes):
+            return sse_event({"reload": True}, "reload", current)
+        if changes:
+            return sse_event(changes, "cells", current)
+        if current != previous:
+            # Курсор другого процесса заменён нашим — браузер запомнит его как Last-Event-ID
+            return f"id: {current}\n\n"
+        return ": ping\n\n"
+
+    if "wsgi.version" in request.META:
+        # Под WSGI открытый поток занимал бы поток воркера: отвечаем сразу тем, что уже есть,
+        # а EventSource сам переспрашивает через retry
+        changes, current = arrangement_feed.since(day, cursor)
+        response = HttpResponse(f"retry: {ARRANGEMENT_EVENTS_POLL_MS}\n\n" + event(changes, cursor, current),
+                                content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    async def stream():
+        nonlocal cursor
+        yield "retry: 2000\n\n"
+        deadline = time.monotonic() + ARRANGEMENT_EVENTS_TIMEOUT
+        while (remaining := deadline - time.monotonic()) > 0:
+            previous = cursor
+            changes, cursor = await arrangement_feed.wait(day, cursor, min(ARRANGEMENT_EVENTS_HEARTBEAT, remaining))
+            yield event(changes, previous, cursor)
+            if needs_reload(changes):
+                return
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx не должен копить поток
+    return response
+
+
 def arrangement_update(request, pk):
     if request.method == "POST":
         try:
@@ -212,10 +331,14 @@ def arrangement_update(request, pk):
 
             arrangements = Arrangement.objects.get(pk=pk)
 
-            # Проверяем, есть ли такое поле у модели
-            if hasattr(arrangements, field):
+            # Только ячейки таблицы, как в arrangement_bulk_update: дату, сотрудника и связи с сетки не меняют
+            if field in Arrangement.EDITABLE_FIELDS:
+                value = "" if value is None else str(value)
                 setattr(arrangements, field, value)
                 arrangements.save(update_fields=[field])
+                if field in SUMMARY_FIELDS:
+                    refresh_day_summaries([arrangements.date_create])
+                publish_cells(arrangements.date_create, [{"id": pk, "field": field, "value": value}])
                 return JsonResponse({"success": True, "field": field, "value": value})
             else:
                 return JsonResponse({"success": False, "error": "Invalid field"})
@@ -224,38 +347,97 @@ def arrangement_update(request, pk):
     return JsonResponse({"success": False, "error": "Invalid request"})
 
 
+# Максимум правок в одном пакетном запросе
+ARRANGEMENT_BULK_LIMIT = 1000
+
+
+def arrangement_bulk_update(request):
+    """Пакетное сохранение ячеек расстановки: [{id, field, value}, ...] в одной транзакции"""
+    if request.method != "POST":
+        return JsonResponse({"success": False, "error": "Invalid request"})
+    try:
+        edits = json.loads(request.body).get("edits")
+    except (ValueError, AttributeError):
+        return JsonResponse({"success": False, "error": "Invalid JSON"}, status=400)
+    if not isinstance(edits, list) or len(edits) > ARRANGEMENT_BULK_LIMIT:
+        return JsonResponse({"success": False, "error": "Invalid edits"}, status=400)
+
+    # Одна и та же ячейка могла измениться несколько раз — оставляем последнее значение
+    values = {}
+    errors = []
+    for edit in edits:
+        if not isinstance(edit, dict):
+            continue
+        field = edit.get("field")
+        try:
+            pk = int(edit.get("id"))
+        except (TypeError, ValueError):
+            errors.append({"id": edit.get("id"), "field": field, "error": "Invalid id"})
+            continue
+        if field not in Arrangement.EDITABLE_FIELDS:
+            errors.append({"id": pk, "field": field, "error": "Invalid field"})
+            continue
+        value = edit.get("value")
+        values[(pk, field)] = "" if value is None else str(value)
+
+    with transaction.atomic():
+        objects = (Arrangement.objects.only("id", "date_create", *Arrangement.EDITABLE_FIELDS)
+                   .in_bulk({pk for pk, _ in values}))
+
+        # По одному UPDATE на поле: не затираем соседние ячейки, которые правит кто-то другой
+        by_field = {}
+        changes = {}
+        for (pk, field), value in values.items():
+            obj = objects.get(pk)
+            if obj is None:
+                errors.append({"id": pk, "field": field, "error": "Object not found"})
+                continue
+            setattr(obj, field, value)
+            by_field.setdefault(field, []).append(obj)
+            changes.setdefault(obj.date_create, []).append({"id": pk, "field": field, "value": value})
+
+        updated = 0
+        for field, objs in by_field.items():
+            updated += Arrangement.objects.bulk_update(objs, [field], batch_size=500)
+
+        refresh_day_summaries(day for day, day_changes in changes.items()
+                              if any(change["field"] in SUMMARY_FIELDS for change in day_changes))
+        for day, day_changes in changes.items():
+            publish_cells(day, day_changes)
+
+    return JsonResponse({"success": not errors, "updated": updated, "errors": errors})
+
+
 def import_arrangement_day(request):
-    """Импорт данных из выбранной даты (копирует все поля в текущий день)"""
+    """Импорт данных из выбранной даты (копирует все поля в текущий день или диапазон дней)"""
     if request.method == "POST":
-        source_date = timezone.datetime.fromisoformat(request.POST.get("source_date")).date()
-        target_date = timezone.datetime.fromisoformat(request.POST.get("target_date")).date()
+        try:
+            source_date = timezone.datetime.fromisoformat(request.POST.get("source_date")).date()
+            target_date = timezone.datetime.fromisoformat(request.POST.get("target_date")).date()
+            target_date_to_str = request.POST.get("target_date_to")
+            target_date_to = (timezone.datetime.fromisoformat(target_date_to_str).date()
+                              if target_date_to_str else None)
+            days = date_range(target_date, target_date_to)
+        except (TypeError, ValueError):
+            messages.error(request, "Неверная дата.")
+            return redirect("arrangement")
+
+        if len(days) > ARRANGEMENT_INLINE_DAYS:
+            job = submit_job(request, "import_arrangement", source_date=source_date.isoformat(),
+                             target_date=days[0].isoformat(), target_date_to=days[-1].isoformat())
+            return _job_redirect(request, job, target_date,
+                                 f"Импорт на {len(days)} дней поставлен в очередь.",
+                                 "Импортировано {written} записей на %d дней." % len(days))
 
-        source_records = Arrangement.objects.filter(date_create=source_date)
-        if not source_records.exists():
+        copied, written = copy_arrangement_day(source_date, days[0], days[-1])
+        publish_reload(target_date)
+
+        if not copied:
             messages.warning(request, f"Нет данных за {source_date.strftime('%d.%m.%Y')} для импорта.")
             return redirect(f"{reverse('arrangement')}?date={target_date}")
 
-        Arrangement.objects.filter(date_create=target_date).delete()
-
-        new_records = [
-            Arrangement(
-                profile=rec.profile,
-                position=rec.position,
-                audit_conducting=rec.audit_conducting,
-                audit_purpose=rec.audit_purpose,
-                order_num_date=rec.order_num_date,
-                order_dates=rec.order_dates,
-                audit_address=rec.audit_address,
-                on_status=rec.on_status,
-                time_check=rec.time_check,
-                time_not_start=rec.time_not_start,
-                date_create=target_date,
-            )
-            for rec in source_records
-        ]
-        Arrangement.objects.bulk_create(new_records)
         messages.success(request,
-                         f"Импортировано {len(new_records)} записей из {source_date.strftime('%d.%m.%Y')}.")
+                         f"Импортировано {written} записей из {source_date.strftime('%d.%m.%Y')}.")
         return redirect(f"{reverse('arrangement')}?date={target_date}")
 
 
@@ -273,129 +455,161 @@ def clear_arrangement_day(request):
             time_check="",
             time_not_start="",
         )
+        refresh_day_summaries([date_value])
+        publish_reload(date_value)
         messages.info(request, f"Данные за {date_value.strftime('%d.%m.%Y')} очищены.")
     return redirect(f"{reverse('arrangement')}?date={date_value}")
 
 
-def export_contacts_excel(request):
-    """Экспорт списка сотрудников в Excel"""
-    # Создаем новую книгу
-    wb = openpyxl.Workbook()
-    wb.remove(wb.active)
-
-    offices = (
-        Profile.objects.filter(office__isnull=False)
-        .select_related("office", "position", "position__department")
-        .order_by("office__name", "position__department__name", "last_name")
-    )
-
-    # Группируем сотрудников по офисам
-    offices_data = {}
-    for p in offices:
-        offices_data.setdefault(p.office.name, []).append(p)
-
-    border = Border(
-        left=Side(border_style="thin", color="000000"),
-        right=Side(border_style="thin", color="000000"),
-        top=Side(border_style="thin", color="000000"),
-        bottom=Side(border_style="thin", color="000000"),
-    )
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+def file_download(request, f, filename, content_type=None):
+    """Открытый файл как вложение. FileResponse итерируется синхронно, и под ASGI Django сначала
+    прочитал бы его целиком в память — там отдаём асинхронный итератор (как CSV в export_arrangement)"""
+    if "wsgi.version" in request.META:
+        return FileResponse(f, as_attachment=True, filename=filename, content_type=content_type)
+    response = StreamingHttpResponse(aiter_file(f), content_type=content_type or "application/octet-stream")
+    response["Content-Length"] = os.fstat(f.fileno()).st_size
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    return response
 
-    today_str = timezone.now().strftime("%d.%m.%Y")
 
-    # Заголовки
-    for office_name, profiles in offices_data.items():
-        ws = wb.create_sheet(title=office_name[:31])  # Excel ограничивает длину имени листа
+async def export_contacts_excel(request):
+    """Экспорт списка сотрудников в Excel"""
+    if request.GET.get("background"):
+        job = await sync_to_async(submit_job)(request, "contacts_export")
+        return JsonResponse({"job": job.pk, "status_url": reverse("job_status", args=[job.pk])}, status=202)
 
-        # Заголовок
-        ws.merge_cells("A1:G1")
-        ws["A1"] = (
-            "Кыргыз Республикасынын Эсептөө палатасынын "
-            f"{office_name} кызматкерлеринин телефондорунун жана отурган кабинеттеринин маалымдамасы"
-        )
-        ws["A1"].font = Font(name="Times New Roman", size=14, bold=True, color="AA0000")
-        ws["A1"].alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        ws.row_dimensions[1].height = 40
-
-        # Подзаголовок (дата)
-        ws.merge_cells("A2:G2")
-        ws["A2"] = f"({timezone.now().strftime('%d.%m.%Y')}-ж. карата)"
-        ws["A2"].alignment = Alignment(horizontal="center", vertical="center")
-        ws["A2"].font = Font(name="Times New Roman", size=12, italic=True, color="555555")
-
-        if "Борбордук аппарат" in office_name:
-            ws.merge_cells("A3:G3")
-            ws["A3"] = (
-                "почтанын дареги: 720033, Бишкек ш., Исанов көч., 131, факс: 32 35 11"
-            )
-            ws["A3"].alignment = Alignment(horizontal="center", vertical="center")
-            ws["A3"].font = Font(name="Times New Roman", size=12, italic=True, color="AA0000")
-            start_row = 5
-        else:
-            start_row = 4
-
-        # Заголовки таблицы
-        headers = ["№", "Аты-жөнү", "Кызмат орду", "Кызматтык телефон №", "Өкмөттүк №", "Мобилдик телефон №", "Каб. №"]
-        ws.append(headers)
-        header_row = start_row
-
-        header_fill = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=4, column=col_num, value=header)
-            cell.font = Font(name="Times New Roman", size=12, bold=True)
-            cell.fill = header_fill
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            cell.border = border
-
-        # Начинаем со строки 5
-        row_num = header_row + 1
-
-        departments = {}
-        for p in profiles:
-            dept_name = p.position.department.name if p.position and p.position.department else "Башка"
-            departments.setdefault(dept_name, []).append(p)
-
-        # Добавляем подразделы
-        for dept, profs in departments.items():
-            ws.merge_cells(start_row=row_num, start_column=1, end_row=row_num, end_column=7)
-            cell = ws.cell(row=row_num, column=1, value=dept)
-            cell.font = Font(name="Times New Roman", size=12, bold=True, color="000080")
-            cell.fill = PatternFill(start_color="E2EFDA", end_color="E2EFDA", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center")
-            row_num += 1
-
-            for i, p in enumerate(profs, start=1):
-                ws.append([
-                    i,
-                    p.full_name(),
-                    p.position.title if p.position else "",
-                    p.phone_number_work or "",
-                    p.phone_number_government or "",
-                    p.phone_number_mobile or "",
-                    p.office_number or "",
-                ])
-                for col in range(1, 8):
-                    c = ws.cell(row=row_num, column=col)
-                    c.font = Font(name="Times New Roman", size=12)
-                    c.border = border
-                    c.alignment = Alignment(vertical="center", wrap_text=True)
-                row_num += 1
-
-            ws.append([])
-            row_num += 1
-
-        # Подгон ширины
-        widths = [5, 30, 20, 18, 15, 20, 10]
-        for i, w in enumerate(widths, start=1):
-            ws.column_dimensions[get_column_letter(i)].width = w
+    # Файл определяется версией справочника и датой в заголовке
+    etag = f"contacts-{await aget_directory_version()}-{timezone.localdate():%Y%m%d}"
+    last_modified = await adirectory_last_modified()
+    if response := not_modified(request, etag, last_modified):
+        return response
 
+    today_str = timezone.now().strftime("%d.%m.%Y")
     filename = f"Справочник телефонов на {today_str}.xlsx"
-    encoded_filename = quote(filename)
 
-    # Отправляем файл пользователю
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = f"attachment; filename*=UTF-8''{encoded_filename}"
-    wb.save(response)
-    return response
+    # Книга пишется построчно в файл и отдаётся потоком — память не растёт с числом сотрудников.
+    # Файл переиспользуется, пока данные справочника не изменились; сборка идёт в потоке,
+    # чтобы не останавливать цикл событий.
+    path = await sync_to_async(cached_export_path)(write_contacts_workbook, "contacts", ".xlsx")
+
+    response = file_download(request, open(path, "rb"), filename, XLSX_CONTENT_TYPE)
+    return add_validators(response, etag, last_modified)
+
+
+REPORT_COLUMNS = ("total", "inspectors", "on_audit", "on_leave", "absent_at_check", "not_started")
+
+
+def _report_range(params):
+    """Диапазон отчёта из GET-параметров; по умолчанию — текущий месяц. None — неверная дата"""
+    today = timezone.localdate()
+    try:
+        start = date.fromisoformat(params["date_from"]) if params.get("date_from") else today.replace(day=1)
+        end = date.fromisoformat(params["date_to"]) if params.get("date_to") else today
+    except ValueError:
+        return None
+    return (start, end) if start <= end else (end, start)
+
+
+def arrangement_report(request):
+    """Статистика расстановки за период по готовым дневным сводкам"""
+    period = _report_range(request.GET)
+    if period is None:
+        messages.error(request, "Неверная дата.")
+        period = _report_range({})
+    days, totals = summary_report(*period)
+    return render(request, "core/arrangement_report.html", {
+        "date_from": period[0],
+        "date_to": period[1],
+        "days": days,
+        "totals": totals,
+    })
+
+
+def arrangement_report_api(request):
+    period = _report_range(request.GET)
+    if period is None:
+        return JsonResponse({"success": False, "error": "Invalid date"}, status=400)
+    days, totals = summary_report(*period)
+    return JsonResponse({
+        "date_from": period[0],
+        "date_to": period[1],
+        "days": [{"date": day.date, **{column: getattr(day, column) for column in REPORT_COLUMNS}} for day in days],
+        "totals": totals,
+    })
+
+
+async def export_arrangement(request):
+    """Выгрузка расстановки за период: CSV отдаётся потоком, Excel длиннее дня собирает фоновая задача"""
+    period = _report_range(request.GET)
+    try:
+        days = date_range(*period) if period else None
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+    if days is None:
+        return JsonResponse({"success": False, "error": "Invalid date"}, status=400)
+    start, end = days[0], days[-1]
+    name = f"Жайгаштыруу {start:%d.%m.%Y}-{end:%d.%m.%Y}"
+
+    if request.GET.get("format") == "csv":
+        # Итератор под тип сервера: иначе Django соберёт весь ответ в память перед отправкой
+        rows = iter_arrangement_csv(start, end) if "wsgi.version" in request.META else aiter_arrangement_csv(start, end)
+        response = StreamingHttpResponse(rows, content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = content_disposition_header(True, f"{name}.csv")
+        return response
+
+    layout = "table" if request.GET.get("layout") == "table" else "days"
+    if request.GET.get("background") or len(days) > ARRANGEMENT_INLINE_DAYS:
+        job = await sync_to_async(submit_job)(request, "arrangement_export", date_from=start.isoformat(),
+                                              date_to=end.isoformat(), layout=layout)
+        return JsonResponse({"job": job.pk, "status_url": reverse("job_status", args=[job.pk])}, status=202)
+
+    buffer = io.BytesIO()
+    await sync_to_async(write_arrangement_workbook)(buffer, start, end, layout)
+    buffer.seek(0)
+    return FileResponse(buffer, as_attachment=True, filename=f"{name}.xlsx", content_type=XLSX_CONTENT_TYPE)
+
+
+def _get_job(request, pk):
+    job = get_object_or_404(Job, pk=pk)
+    # Чужие задачи видит только персонал; задачи анонимного пользователя — та сессия, что их поставила
+    if request.user.is_staff:
+        return job
+    if job.created_by_id is not None:
+        owner = job.created_by_id == request.user.id
+    else:
+        owner = job.pk in request.session.get(SESSION_JOBS_KEY, [])
+    if not owner:
+        raise Http404
+    return job
+
+
+def job_status(request, pk):
+    """Состояние фоновой задачи для опроса со страницы"""
+    job = _get_job(request, pk)
+    return JsonResponse({
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "result": job.result,
+        "error": job.error,
+        "download_url": reverse("job_download", args=[job.pk]) if job.result_file else None,
+    })
+
+
+def job_download(request, pk):
+    job = _get_job(request, pk)
+    if job.status != Job.DONE or not job.result_file:
+        raise Http404
+    try:
+        f = open(job.result_file, "rb")
+    except OSError:
+        raise Http404
+    filename = (job.result or {}).get("filename") or job.result_file.rsplit("/", 1)[-1]
+    return file_download(request, f, filename, mimetypes.guess_type(filename)[0])
+
+
+@staff_member_required
+def profiling_stats(request):
+    """Сводка RequestProfilingMiddleware по именам URL (только текущий процесс, с его запуска)"""
+    return JsonResponse({"pid": os.getpid(), "views": RequestProfilingMiddleware.snapshot()})